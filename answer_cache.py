@@ -0,0 +1,162 @@
+import json
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+create table if not exists answers (
+    digest text not null,
+    model text not null,
+    question_key text not null,
+    terms text not null,
+    answer text not null,
+    sources text not null,
+    created_at real not null,
+    last_hit_at real not null,
+    hits integer not null default 0,
+    primary key (digest, model, question_key)
+);
+create index if not exists answers_lru_idx on answers (digest, last_hit_at);
+create index if not exists answers_created_idx on answers (created_at);
+create index if not exists answers_terms_idx on answers (digest, model, terms);
+"""
+
+# Version 1 stores ``terms`` in question order; earlier rows held an unordered set
+_SCHEMA_VERSION = 1
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Words that don't change what is being asked; question words stay so "why" and "how" differ
+_FILLER = frozenset(
+    "a an the is are was were be this that these those of to in on for please me us could would "
+    "can you tell explain give i we my our it its s do does".split()
+)
+
+
+def question_key(question: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a question, for exact matches."""
+    return " ".join(_WORD_RE.findall(question.lower()))
+
+
+def question_terms(question: str) -> str:
+    """Content words of a question in order, with a crude plural strip, for near-duplicate matches.
+
+    Questions that differ only in filler words or plural endings share their
+    terms; any other word, a number or a change of word order does not.
+    """
+    terms = []
+    for word in _WORD_RE.findall(question.lower()):
+        if word in _FILLER:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return " ".join(terms)
+
+
+class AnswerCache(SQLiteStore):
+    """SQLite store of chat answers keyed by (PDF content hash, model, question).
+
+    A lookup first tries the normalized question, then a cached question for
+    the same document that differs from it only in filler words or plural
+    endings (see ``question_terms``). Entries expire after ``ttl_seconds``; each document
+    keeps at most ``max_per_note`` answers, dropping the least recently used.
+    Answers only make sense for questions asked without conversation
+    history, so callers should skip the cache (and report it with
+    ``skip``) when there is any.
+    """
+
+    schema = _SCHEMA
+
+    def __init__(self, db_path: str = "cache/answers.db", ttl_seconds: float = 3 * 24 * 3600,
+                 max_per_note: int = 200):
+        self.ttl_seconds = ttl_seconds
+        self.max_per_note = max_per_note
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "near_hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+        super().__init__(db_path)
+        with self._connect() as conn:
+            if conn.execute("pragma user_version").fetchone()[0] < _SCHEMA_VERSION:
+                # Cached answers are cheap to lose; rows with old-style terms would mis-match
+                conn.execute("delete from answers")
+                conn.execute(f"pragma user_version = {_SCHEMA_VERSION}")
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def get(self, digest: str, model: str, question: str) -> Optional[Tuple[str, List[Dict]]]:
+        """Return ``(answer, sources)`` for this or a near-identical question, or None."""
+        key = question_key(question)
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            row = conn.execute(
+                "select question_key, answer, sources from answers"
+                " where digest = ? and model = ? and question_key = ? and created_at >= ?",
+                (digest, model, key, cutoff),
+            ).fetchone()
+            kind = "hits"
+            if row is None:
+                terms = question_terms(question)
+                if terms:
+                    row = conn.execute(
+                        "select question_key, answer, sources from answers"
+                        " where digest = ? and model = ? and terms = ? and created_at >= ?"
+                        " order by last_hit_at desc limit 1",
+                        (digest, model, terms, cutoff),
+                    ).fetchone()
+                if row is None:
+                    self._count("misses")
+                    return None
+                kind = "near_hits"
+            conn.execute(
+                "update answers set hits = hits + 1, last_hit_at = ?"
+                " where digest = ? and model = ? and question_key = ?",
+                (time.time(), digest, model, row[0]),
+            )
+        self._count(kind)
+        return row[1], json.loads(row[2])
+
+    def put(self, digest: str, model: str, question: str, answer: str, sources: List[Dict]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "insert or replace into answers"
+                " (digest, model, question_key, terms, answer, sources, created_at, last_hit_at)"
+                " values (?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, model, question_key(question), question_terms(question),
+                 answer, json.dumps(sources), now, now),
+            )
+            evicted = conn.execute(
+                "delete from answers where digest = ? and rowid not in"
+                " (select rowid from answers where digest = ? order by last_hit_at desc limit ?)",
+                (digest, digest, self.max_per_note),
+            ).rowcount
+        self._count("stores")
+        if evicted:
+            self._count("evictions", evicted)
+
+    def skip(self) -> None:
+        """Count a question answered without the cache because it had conversation history."""
+        self._count("bypassed")
+
+    def invalidate(self, digest: str) -> int:
+        """Delete every cached answer for a document. Returns the number removed."""
+        with self._connect() as conn:
+            return conn.execute("delete from answers where digest = ?", (digest,)).rowcount
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            return conn.execute("delete from answers where created_at < ?", (cutoff,)).rowcount
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            served = self._stats["hits"] + self._stats["near_hits"]
+            lookups = served + self._stats["misses"]
+            return {**self._stats, "hit_rate": served / lookups if lookups else 0.0, "groq_calls_saved": served}
@@ -1,22 +1,38 @@
+import asyncio
+import json
 import logging
 import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Awaitable, Callable, List, Optional, Tuple
 from uuid import uuid4
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request, Body, Query
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Body, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response, HTMLResponse
+from fastapi.responses import JSONResponse, Response, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from groq import Groq
+from groq import AsyncGroq, RateLimitError
 from dotenv import load_dotenv
-import requests
 from supabase import create_client, Client
 
-from utils import extract_text_from_pdf, clean_text, save_podcast_metadata, get_podcast_metadata
-from podcast_generator import generate_podcast_script, create_audio
+from utils import (extract_text_from_pdf, extract_clean_pages, clean_text, save_podcast_metadata,
+                   get_podcast_metadata, get_metadata_store)
+from note_cache import NoteTextCache, content_hash, join_pages
+from retrieval import NoteIndexStore
+from summary_cache import SummaryCache
+from summarizer import CallLimiter, MapReduceSummarizer
+from llm_gateway import LLMGateway, INTERACTIVE, BULK, BACKGROUND
+from chat_sessions import ChatSessionStore, estimate_tokens, history_window
+from answer_cache import AnswerCache
+from media import serve_media
+from storage_client import StorageClient, StorageError
+from metrics import (REQUEST_SECONDS, stage, start_request_spans, finish_request_spans,
+                     server_timing_header, render_metrics)
+from jobs import JobStore, LeaseLost, run_worker, COMPLETED, FAILED
+from podcast_generator import generate_podcast_script, create_audio, podcast_output_path, tts_cache
 
 # Setup logging
 logging.basicConfig(
@@ -61,11 +77,132 @@ except Exception as e:
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "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")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "mistral-saba-24b")
 
-# Initialize Groq client
-client = Groq(api_key=GROQ_API_KEY)
+# Groq's limits are per account, but the gateway's buckets are per process. GROQ_RATE_SHARE is
+# this process's fraction of them: all of it when jobs run in-process, half when separate
+# worker.py processes (a quarter each by default) take the jobs. Keep the shares summing to 1
+GROQ_RATE_SHARE = float(os.getenv("GROQ_RATE_SHARE", 1.0 if int(os.getenv("EMBEDDED_WORKERS", 1)) > 0 else 0.5))
+
+# Initialize the Groq client; every completion goes through the gateway's rate limits and retries
+async_client = AsyncGroq(api_key=GROQ_API_KEY)
+llm = LLMGateway(
+    async_client,
+    GROQ_MODEL,
+    fallback_model=os.getenv("GROQ_FALLBACK_MODEL") or None,
+    requests_per_minute=float(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30)) * GROQ_RATE_SHARE,
+    tokens_per_minute=float(os.getenv("GROQ_TOKENS_PER_MINUTE", 0)) * GROQ_RATE_SHARE,
+    retries=int(os.getenv("GROQ_RETRIES", 3)),
+    backoff=float(os.getenv("GROQ_RETRY_BACKOFF", 1.0)),
+    fallback_after=float(os.getenv("GROQ_FALLBACK_AFTER", 2.0)),
+)
+
+# Shared keep-alive pool for downloads from Supabase Storage
+storage_client = StorageClient(
+    max_bytes=int(os.getenv("STORAGE_MAX_MB", 50)) * 1024 * 1024,
+    timeout=float(os.getenv("STORAGE_TIMEOUT", 15)),
+    retries=int(os.getenv("STORAGE_RETRIES", 2)),
+)
+
+async def run_query(query):
+    """Execute a Supabase query builder without blocking the event loop."""
+    with stage("supabase", "query"):
+        return await asyncio.to_thread(query.execute)
+
+def llm_busy() -> HTTPException:
+    """The 503 for a Groq call still rate limited after the gateway's retries."""
+    logger.error("Groq is still rate limiting after retries")
+    return HTTPException(status_code=503, detail="The AI service is busy. Please try again shortly.",
+                         headers={"Retry-After": "10"})
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def stream_completion(messages: list, trailer: Optional[Tuple[str, dict]] = None,
+                      on_complete: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                      pipeline: str = "llm", priority: int = INTERACTIVE, **params) -> StreamingResponse:
+    """Stream a Groq completion to the client as server-sent events.
+
+    Emits ``token`` events as text arrives, then the optional ``trailer``
+    event (e.g. ``("sources", {...})``), then ``done``. Failures after the
+    response has started are reported as an ``error`` event. ``on_complete``
+    receives the full text and the model that wrote it (the fallback model
+    if the gateway switched) once the completion finishes successfully.
+    """
+    async def events():
+        parts = []
+        model = params.get("model") or llm.model
+        try:
+            with stage(pipeline, "llm_stream"):
+                stream = await llm.stream(messages=messages, priority=priority, **params)
+                async for chunk in stream:
+                    model = llm.served_model(chunk)
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield sse_event("token", {"text": delta})
+            if trailer:
+                yield sse_event(*trailer)
+        except Exception as e:
+            logger.error(f"Groq streaming error: {str(e)}", exc_info=True)
+            yield sse_event("error", {"detail": f"Groq API error: {str(e)}"})
+        else:
+            if on_complete and parts:
+                await on_complete("".join(parts).strip(), model)
+        yield sse_event("done", {})
+
+    return sse_response(events())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In-process workers keep `python app.py` self-contained; set EMBEDDED_WORKERS=0
+    # and run `python worker.py` processes to scale job processing separately
+    worker_task = None
+    if EMBEDDED_WORKERS > 0:
+        worker_task = asyncio.create_task(
+            run_worker(job_store, run_job, concurrency=EMBEDDED_WORKERS, worker_id=f"web:{os.getpid()}",
+                       on_expired=finish_failed_job)
+        )
+    yield
+    if worker_task:
+        worker_task.cancel()
+    await storage_client.aclose()
+    await async_client.close()
 
 # Initialize FastAPI app
-app = FastAPI(title="Podcast Generator API")
+app = FastAPI(title="Podcast Generator API", lifespan=lifespan)
+
+# Stage timings go back to the client in a Server-Timing header when enabled
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    token = start_request_spans()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        spans = finish_request_spans(token)
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(request.method, getattr(route, "path", "unmatched"), str(status)).observe(elapsed)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing_header(spans, elapsed)
+    return response
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this process (request and pipeline stage latencies)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 # Setup CORS
 app.add_middleware(
@@ -78,7 +215,6 @@ app.add_middleware(
 
 # Setup static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/podcasts", StaticFiles(directory="podcasts"), name="podcasts")
 templates = Jinja2Templates(directory="templates")
 
 # Create necessary directories
@@ -86,8 +222,165 @@ os.makedirs("uploads", exist_ok=True)
 os.makedirs("podcasts", exist_ok=True)
 os.makedirs("metadata", exist_ok=True)
 
-# Store tasks in memory (in production, use a proper database)
-TASKS = {}
+# Durable podcast job queue shared with worker processes (see worker.py)
+job_store = JobStore(
+    db_path=os.getenv("JOB_DB_PATH", "cache/jobs.db"),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", 600)),
+)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# Ingestion is quick and makes a note's first interaction fast, so it runs ahead of podcasts
+INGEST_PRIORITY = int(os.getenv("INGEST_PRIORITY", 10))
+# How long a progressive stream waits for audio to appear / between new bytes
+PODCAST_STREAM_WAIT = float(os.getenv("PODCAST_STREAM_WAIT", 300))
+PODCAST_STREAM_POLL = float(os.getenv("PODCAST_STREAM_POLL", 0.5))
+# Progress events: how often the job row is checked, how often chunk progress is
+# written to it, and the keep-alive interval for idle event streams
+JOB_EVENTS_POLL = float(os.getenv("JOB_EVENTS_POLL", 0.5))
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", 0.5))
+JOB_EVENTS_KEEPALIVE = float(os.getenv("JOB_EVENTS_KEEPALIVE", 15))
+EMBEDDED_WORKERS = int(os.getenv("EMBEDDED_WORKERS", 1))
+# Longest a sync=true upload waits for its job before answering 504 with the job's status
+JOB_SYNC_TIMEOUT = float(os.getenv("JOB_SYNC_TIMEOUT", 600))
+
+# Lease owner of each job running in this process, so its writes are dropped once it is taken over
+_job_owners = {}
+
+async def update_task(task_id: str, **fields) -> None:
+    """Record job progress (also renews the worker's lease on the job)."""
+    await asyncio.to_thread(job_store.update, task_id, _job_owners.get(task_id), **fields)
+
+# Cache of cleaned note text, keyed by note version and PDF content hash
+note_cache = NoteTextCache(
+    cache_dir=os.getenv("NOTE_CACHE_DIR", "cache/notes"),
+    max_memory_bytes=int(os.getenv("NOTE_CACHE_MEMORY_MB", 64)) * 1024 * 1024,
+    max_disk_bytes=int(os.getenv("NOTE_CACHE_DISK_MB", 512)) * 1024 * 1024,
+)
+
+# Per-note BM25 retrieval indexes, addressed by the same PDF content hash
+note_indexes = NoteIndexStore(
+    index_dir=os.getenv("NOTE_INDEX_DIR", "cache/indexes"),
+    max_disk_bytes=int(os.getenv("NOTE_INDEX_DISK_MB", 256)) * 1024 * 1024,
+)
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", 6))
+
+# Generated summaries, keyed by PDF content hash and the options that shape the output
+summary_cache = SummaryCache(
+    db_path=os.getenv("SUMMARY_CACHE_DB", "cache/summaries.db"),
+    ttl_seconds=float(os.getenv("SUMMARY_CACHE_TTL_HOURS", 24 * 7)) * 3600,
+    stale_seconds=float(os.getenv("SUMMARY_CACHE_STALE_HOURS", 24 * 30)) * 3600,
+)
+# Background regenerations of stale summaries, by cache key
+_summary_refreshes = {}
+
+# Long notes are condensed chunk by chunk so nothing past the prompt window is dropped
+summarizer = MapReduceSummarizer(
+    llm,
+    GROQ_MODEL,
+    cache=summary_cache,
+    window_chars=int(os.getenv("SUMMARY_WINDOW_CHARS", 32000)),
+    chunk_chars=int(os.getenv("SUMMARY_CHUNK_CHARS", 12000)),
+    concurrency=int(os.getenv("SUMMARY_MAP_CONCURRENCY", 4)),
+)
+
+# Batch summaries: how many notes load at once and how fast their final Groq calls start
+SUMMARY_BATCH_MAX_NOTES = int(os.getenv("SUMMARY_BATCH_MAX_NOTES", 50))
+batch_fetch_slots = asyncio.Semaphore(int(os.getenv("SUMMARY_BATCH_FETCH_CONCURRENCY", 8)))
+batch_llm_limiter = CallLimiter(
+    concurrency=int(os.getenv("SUMMARY_BATCH_LLM_CONCURRENCY", 4)),
+    per_minute=float(os.getenv("SUMMARY_BATCH_LLM_PER_MINUTE", 0)),
+)
+
+# Chat conversations: a note is resolved once per session and history is kept within a token budget
+chat_sessions = ChatSessionStore(
+    db_path=os.getenv("CHAT_SESSION_DB", "cache/chat_sessions.db"),
+    ttl_seconds=float(os.getenv("CHAT_SESSION_TTL_HOURS", 24)) * 3600,
+)
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", 2000))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", 400))
+CHAT_SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a student and a study assistant about a note. "
+    "Keep the questions asked, the answers' key facts and anything the student said about their goals "
+    "or confusion; drop pleasantries. Output only the updated summary.\n\n"
+    "Current summary:\n{summary}\n\nNew turns:\n{transcript}"
+)
+# Background folds of old turns into a session's summary, by session id
+_session_compactions = {}
+
+# Answers to opening questions, shared by everyone asking about the same document
+answer_cache = AnswerCache(
+    db_path=os.getenv("ANSWER_CACHE_DB", "cache/answers.db"),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_HOURS", 72)) * 3600,
+    max_per_note=int(os.getenv("ANSWER_CACHE_PER_NOTE", 200)),
+)
+
+async def fetch_note_file(url: str, etag: Optional[str] = None):
+    """Download a note's file through the shared storage client, mapping failures to HTTP errors."""
+    try:
+        with stage("note", "download"):
+            return await storage_client.fetch(url, etag=etag)
+    except StorageError as e:
+        logger.error(e.detail)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+async def load_note_pages(note_id: str, note: dict) -> Tuple[str, List[str]]:
+    """Return ``(content_hash, cleaned page texts)`` for a note's PDF.
+
+    The PDF is downloaded and parsed only on a cache miss. ``note`` is the
+    notes row and must contain ``file_path``; ``updated_at`` (when selected)
+    versions the cache entry so edited notes are re-fetched.
+    """
+    file_path = note["file_path"]
+    version = f"{note['updated_at']}|{file_path}" if note.get("updated_at") else None
+
+    cached = await asyncio.to_thread(note_cache.get, note_id, version)
+    if cached is not None:
+        logger.info(f"Serving text for note {note_id} from cache")
+        return cached
+
+    # The note row changed; if the file itself didn't, a conditional GET avoids the download
+    known = await asyncio.to_thread(note_cache.validator, note_id, file_path)
+    logger.info(f"Downloading PDF from: {file_path}")
+    fetched = await fetch_note_file(file_path, etag=known[1] if known else None)
+    if fetched.not_modified:
+        pages = await asyncio.to_thread(note_cache.get_by_content, note_id, version, known[0], file_path, known[1])
+        if pages is not None:
+            logger.info(f"PDF for note {note_id} not modified, reusing cached text")
+            return known[0], pages
+        # Cached text was evicted; fetch the file unconditionally
+        fetched = await fetch_note_file(file_path)
+    pdf_bytes = fetched.content
+    if not pdf_bytes:
+        raise HTTPException(status_code=400, detail="Downloaded PDF is empty")
+
+    digest = content_hash(pdf_bytes)
+    pages = await asyncio.to_thread(note_cache.get_by_content, note_id, version, digest, file_path, fetched.etag)
+    if pages is not None:
+        logger.info(f"PDF for note {note_id} unchanged, reusing cached text")
+        return digest, pages
+
+    try:
+        logger.info("Extracting text from PDF...")
+        # Parsing is CPU-bound; large PDFs fan out further to the extraction process pool
+        with stage("note", "extract"):
+            pages = await asyncio.to_thread(extract_clean_pages, pdf_bytes)
+        if not join_pages(pages).strip():
+            raise ValueError("Extracted text is empty")
+    except Exception as e:
+        error_msg = f"Error processing PDF: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    await asyncio.to_thread(note_cache.put, note_id, version, digest, pages, file_path, fetched.etag)
+    # Index at ingestion so chat questions only pay for a lookup
+    with stage("note", "index"):
+        await asyncio.to_thread(note_indexes.build, digest, pages)
+    logger.info(f"Extracted {len(pages)} pages from PDF")
+    return digest, pages
+
+async def load_note_text(note_id: str, note: dict) -> str:
+    """Return the cleaned text of a note's PDF as a single string."""
+    _, pages = await load_note_pages(note_id, note)
+    return join_pages(pages)
 
 class PodcastStatus(BaseModel):
     status: str
@@ -105,12 +398,28 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the note text, summary, answer and TTS phrase caches"""
+    return {
+        "note_text": note_cache.stats(),
+        "summary": summary_cache.stats(),
+        "answers": answer_cache.stats(),
+        "tts": tts_cache.stats()
+    }
+
+@app.delete("/api/summaries/{note_id}")
+async def invalidate_summaries(note_id: str):
+    """Drop cached summaries for a note so the next request regenerates them"""
+    removed = await asyncio.to_thread(summary_cache.invalidate, note_id)
+    return {"note_id": note_id, "invalidated": removed}
+
 @app.post("/create-podcast")
 async def create_podcast(
-    background_tasks: BackgroundTasks,
     pdf_file: UploadFile = File(...),
     model: Optional[str] = Form(None),
-    sync: bool = Form(False)
+    sync: bool = Form(False),
+    priority: int = Form(0)
 ):
     # Use requested model or default from GROQ_MODEL
     model = model or GROQ_MODEL
@@ -123,58 +432,212 @@ async def create_podcast(
     try:
         # Save uploaded file
         file_path = f"uploads/{task_id}_{pdf_file.filename}"
-        with open(file_path, "wb") as f:
-            content = await pdf_file.read()
-            f.write(content)
+        content = await pdf_file.read()
+        await asyncio.to_thread(_write_file, file_path, content)
         
-        # Initialize task status
-        TASKS[task_id] = {
-            "status": "processing",
-            "message": "Processing PDF...",
-            "progress": 0.1
-        }
+        # Queue the job for a worker
+        await asyncio.to_thread(
+            job_store.enqueue,
+            "podcast_from_upload",
+            {"file_path": file_path, "model": model, "original_filename": pdf_file.filename},
+            job_id=task_id,
+            priority=priority,
+            max_attempts=JOB_MAX_ATTEMPTS
+        )
         
-        # Process podcast (sync or async)
+        # In sync mode, hold the request until a worker has finished the job
         if sync:
-            await process_podcast_creation(
-                task_id,
-                file_path,
-                model,
-                pdf_file.filename
-            )
-        else:
-            background_tasks.add_task(
-                process_podcast_creation,
-                task_id,
-                file_path,
-                model,
-                pdf_file.filename
-            )
+            job = await wait_for_task(task_id, timeout=JOB_SYNC_TIMEOUT)
+            if job is not None and job["status"] not in (COMPLETED, FAILED):
+                return JSONResponse(status_code=504, content={"task_id": task_id, **task_status(job)})
         return {"task_id": task_id}
     except Exception as e:
         logger.error(f"Error in create_podcast: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+async def wait_for_task(task_id: str, timeout: float, poll_interval: float = 0.5) -> dict:
+    """Wait until a job reaches a terminal state, or ``timeout`` seconds pass, and return it."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await asyncio.to_thread(job_store.get, task_id)
+        if job is None or job["status"] in (COMPLETED, FAILED) or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(poll_interval)
+
+def task_status(job: dict) -> dict:
+    """Shape a job row like the status payload clients already poll for."""
+    status = {
+        "status": job["status"],
+        "message": job["message"],
+        "progress": job["progress"],
+        "audio_url": None,
+        "stream_url": f"/api/stream_podcast/{job['id']}",
+        "events_url": f"/api/podcast_events/{job['id']}",
+        "attempts": job["attempts"],
+    }
+    if job["detail"]:
+        status.update(job["detail"])
+    if job["result"]:
+        status.update(job["result"])
+    return status
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def _extract_clean_text(pdf_bytes: bytes) -> str:
+    # Parsing and cleaning are both CPU-bound, so they run together off the event loop
+    return clean_text(extract_text_from_pdf(pdf_bytes))
+
+@app.get("/api/podcast_status/{task_id}")
 @app.get("/podcast_status/{task_id}")
 async def get_podcast_status(task_id: str):
-    task = TASKS.get(task_id)
-    if not task:
+    job = await asyncio.to_thread(job_store.get, task_id)
+    if not job:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task
+    return task_status(job)
 
-@app.get("/get_podcast/{task_id}")
-async def get_podcast(task_id: str):
-    metadata = get_podcast_metadata(task_id)
+async def job_events(task_id: str):
+    """Yield SSE ``progress`` events whenever the job row changes, ending with
+    a ``completed`` or ``failed`` event. Jobs may run in another process, so
+    the shared job store is the channel."""
+    last_update = None
+    idle = 0.0
+    while True:
+        job = await asyncio.to_thread(job_store.get, task_id)
+        if job is None:
+            yield sse_event("failed", {"status": FAILED, "message": "Task not found"})
+            return
+        if job["updated_at"] != last_update:
+            last_update = job["updated_at"]
+            idle = 0.0
+            status = task_status(job)
+            if job["status"] in (COMPLETED, FAILED):
+                yield sse_event(job["status"], status)
+                return
+            yield sse_event("progress", status)
+        elif idle >= JOB_EVENTS_KEEPALIVE:
+            idle = 0.0
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(JOB_EVENTS_POLL)
+        idle += JOB_EVENTS_POLL
+
+@app.get("/api/podcast_events/{task_id}")
+@app.get("/podcast_events/{task_id}")
+async def podcast_events(task_id: str):
+    """Server-sent progress events for a podcast job (push alternative to /podcast_status)"""
+    job = await asyncio.to_thread(job_store.get, task_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return sse_response(job_events(task_id))
+
+@app.api_route("/get_podcast/{task_id}", methods=["GET", "HEAD"])
+async def get_podcast(request: Request, task_id: str):
+    metadata = await asyncio.to_thread(get_podcast_metadata, task_id)
     if not metadata or metadata.get("status") != "completed":
         raise HTTPException(status_code=404, detail="Podcast not found or not completed")
     audio_path = metadata.get("output_path")
     if not audio_path or not os.path.exists(audio_path):
         raise HTTPException(status_code=404, detail="Audio file not found")
-    return FileResponse(
-        audio_path,
+    # Completed episodes never change, so they can be cached for good
+    return serve_media(request, audio_path, immutable=True, filename=os.path.basename(audio_path))
+
+@app.get("/api/podcasts")
+async def list_podcasts(
+    user_id: Optional[str] = Query(None),
+    note_id: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0)
+):
+    """List podcast metadata, newest first, filtered by user, note and/or status"""
+    podcasts = await asyncio.to_thread(
+        get_metadata_store().query, user_id=user_id, note_id=note_id, status=status, limit=limit, offset=offset
+    )
+    return {"podcasts": podcasts}
+
+@app.api_route("/podcasts/{filename}", methods=["GET", "HEAD"])
+async def get_podcast_file(request: Request, filename: str):
+    """Serve finished podcast files with range and conditional GET support"""
+    # Only finished episodes; in-progress .part files are served by /api/stream_podcast
+    if filename != os.path.basename(filename) or not filename.endswith(".mp3"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return serve_media(request, os.path.join("podcasts", filename), immutable=True)
+
+async def follow_podcast_audio(task_id: str):
+    """Yield a podcast's MP3 bytes as ``create_audio`` appends them.
+
+    The writer fills ``<path>.part`` in script order and renames it when
+    done; the rename keeps the inode, so an open handle reads through to
+    the end. Streaming stops when the job reaches a terminal state or no
+    new audio arrives within ``PODCAST_STREAM_WAIT`` seconds.
+    """
+    audio_path = podcast_output_path(task_id)
+    part_path = audio_path + ".part"
+    f = None
+    idle = 0.0
+    try:
+        while True:
+            if f is None:
+                for path in (part_path, audio_path):
+                    try:
+                        f = open(path, "rb")
+                        break
+                    except FileNotFoundError:
+                        continue
+            data = f.read(64 * 1024) if f else b""
+            if data:
+                idle = 0.0
+                yield data
+                continue
+            if f is not None and not os.path.exists(part_path):
+                # Renamed (finished) or removed (failed). The writer may have appended
+                # its last chunk between our EOF read and the rename, so drain once more
+                while True:
+                    data = f.read(64 * 1024)
+                    if not data:
+                        break
+                    yield data
+                return
+            job = await asyncio.to_thread(job_store.get, task_id)
+            if job is None or job["status"] == FAILED:
+                return
+            if job["status"] == COMPLETED and f is None:
+                return
+            if idle >= PODCAST_STREAM_WAIT:
+                logger.warning(f"Gave up streaming podcast {task_id}: no new audio for {idle:.0f}s")
+                return
+            await asyncio.sleep(PODCAST_STREAM_POLL)
+            idle += PODCAST_STREAM_POLL
+    finally:
+        if f is not None:
+            f.close()
+
+@app.get("/api/stream_podcast/{task_id}")
+@app.get("/stream_podcast/{task_id}")
+async def stream_podcast(request: Request, task_id: str):
+    """Play a podcast while it is still being generated.
+
+    Finished chunks are sent as soon as they are written, so playback can
+    start after the first seconds of audio exist. Completed podcasts are
+    served as a regular file.
+    """
+    job = await asyncio.to_thread(job_store.get, task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=404, detail="Podcast generation failed")
+    audio_path = podcast_output_path(task_id)
+    if job["status"] == COMPLETED and os.path.exists(audio_path):
+        return serve_media(request, audio_path, immutable=True)
+    return StreamingResponse(
+        follow_podcast_audio(task_id),
         media_type="audio/mpeg",
-        filename=os.path.basename(audio_path),
-        headers={"Accept-Ranges": "bytes"}
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 # Legacy endpoints for backward compatibility
@@ -183,132 +646,313 @@ async def legacy_get_podcast_status(task_id: str):
     return await get_podcast_status(task_id)
 
 @app.get("/podcast/{task_id}")
-async def legacy_get_podcast(task_id: str):
-    return await get_podcast(task_id)
+async def legacy_get_podcast(request: Request, task_id: str):
+    return await get_podcast(request, task_id)
 
 @app.post("/api/generate_podcast_from_note")
-async def generate_podcast_from_note(
-    background_tasks: BackgroundTasks,
-    payload: dict = Body(...)
-):
+async def generate_podcast_from_note(payload: dict = Body(...)):
     note_id = payload.get("note_id")
     podcast_title = payload.get("title", "Podcast")
     user_id = payload.get("user_id")
     if not note_id or not user_id:
         raise HTTPException(status_code=400, detail="note_id and user_id are required")
 
-    # 1. Fetch note record from Supabase
-    note_resp = supabase.table("notes").select("file_path,title").eq("id", note_id).single().execute()
+    # Fail fast on unknown notes; everything else happens on a worker
+    note_resp = await run_query(supabase.table("notes").select("id").eq("id", note_id).single())
     if not note_resp.data:
         raise HTTPException(status_code=404, detail="Note not found")
-    file_path = note_resp.data["file_path"]
-    note_title = note_resp.data["title"]
-
-    # 2. Download PDF from Supabase Storage
-    # file_path is a public URL, so we can use requests.get
-    pdf_resp = requests.get(file_path)
-    if pdf_resp.status_code != 200:
-        raise HTTPException(status_code=404, detail="Could not download PDF from storage")
-    pdf_bytes = pdf_resp.content
 
-    # 3. Generate podcast audio (reuse your logic)
-    task_id = str(uuid4())
-    pdf_filename = f"{task_id}.pdf"
-    audio_filename = f"{task_id}.mp3"
-    pdf_local_path = os.path.join("uploads", pdf_filename)
-    audio_local_path = os.path.join("podcasts", audio_filename)
-    with open(pdf_local_path, "wb") as f:
-        f.write(pdf_bytes)
-
-    # Use your existing process_podcast_creation logic, but synchronously
-    TASKS[task_id] = {
-        "status": "processing",
-        "message": "Processing PDF...",
-        "progress": 0.1
+    task_id = await asyncio.to_thread(
+        job_store.enqueue,
+        "podcast_from_note",
+        {"note_id": note_id, "user_id": user_id, "title": podcast_title},
+        priority=int(payload.get("priority", 0)),
+        max_attempts=JOB_MAX_ATTEMPTS
+    )
+    return {
+        "task_id": task_id,
+        "status": "queued",
+        "status_url": f"/api/podcast_status/{task_id}",
+        "events_url": f"/api/podcast_events/{task_id}"
     }
 
-    try:
-        await process_podcast_creation(
-            task_id,
-            pdf_local_path,
-            GROQ_MODEL,
-            pdf_filename
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Podcast generation failed: {str(e)}")
+async def process_note_podcast(task_id: str, note_id: str, user_id: str, title: Optional[str]) -> dict:
+    """Job handler: generate a podcast for a stored note and publish it to Supabase."""
+    # 1. Fetch note record from Supabase
+    await update_task(task_id, message="Loading note", progress=0.1)
+    note_resp = await run_query(supabase.table("notes").select("file_path,title,updated_at").eq("id", note_id).single())
+    if not note_resp.data:
+        raise ValueError("Note not found")
+    note_title = note_resp.data["title"]
+
+    # 2. Load note text (downloads and parses the PDF only on a cache miss)
+    text_content = await load_note_text(note_id, note_resp.data)
 
-    # 4. Upload audio to Supabase Storage (podcasts bucket)
-    metadata = get_podcast_metadata(task_id)
-    actual_audio_path = metadata.get("output_path", audio_local_path)
-    with open(actual_audio_path, "rb") as f:
-        audio_data = f.read()
+    # 3. Generate podcast audio
+    actual_audio_path = await generate_podcast_audio(task_id, None, GROQ_MODEL, text_content=text_content)
+
+    # 4. Upload audio to Supabase Storage (podcasts bucket); upsert keeps retries idempotent
+    await update_task(task_id, message="Uploading podcast", progress=0.95)
+    audio_data = await asyncio.to_thread(_read_file, actual_audio_path)
     storage_path = f"{user_id}/{os.path.basename(actual_audio_path)}"
-    upload_resp = supabase.storage.from_("podcast_audio").upload(storage_path, audio_data)
+    bucket = supabase.storage.from_("podcast_audio")
+    with stage("podcast", "upload"):
+        upload_resp = await asyncio.to_thread(bucket.upload, storage_path, audio_data, {"upsert": "true"})
     if not upload_resp:
-        raise HTTPException(status_code=500, detail="Failed to upload podcast audio to Supabase")
+        raise RuntimeError("Failed to upload podcast audio to Supabase")
     # Get public URL
-    public_url = supabase.storage.from_("podcast_audio").get_public_url(storage_path)
+    public_url = bucket.get_public_url(storage_path)
 
     # 5. Insert podcast record in Supabase
-    podcast_insert = supabase.table("podcasts").insert({
+    podcast_insert = await run_query(supabase.table("podcasts").insert({
         "user_id": user_id,
         "note_id": note_id,
-        "title": podcast_title or note_title,
+        "title": title or note_title,
         "description": f"Podcast generated from note {note_title}",
         "file_path": public_url,
         "duration": None  # You can update this if you have duration info
-    }).execute()
+    }))
     if not podcast_insert.data:
-        raise HTTPException(status_code=500, detail="Failed to insert podcast record")
+        raise RuntimeError("Failed to insert podcast record")
+    await asyncio.to_thread(
+        save_podcast_metadata,
+        task_id=task_id,
+        metadata={
+            "user_id": user_id,
+            "note_id": note_id,
+            "title": title or note_title,
+            "audio_url": public_url,
+            "original_filename": f"{task_id}.pdf",
+            "output_path": actual_audio_path,
+            # Only now: the podcast isn't complete until it is published
+            "status": "completed"
+        }
+    )
 
-    # 6. Return podcast info
+    # 6. Return podcast info as the job result
     return {
         "podcast": podcast_insert.data[0],
         "audio_url": public_url
     }
 
+@app.post("/api/ingest_note")
+async def ingest_note(note_id: str = Body(..., embed=True, min_length=1)):
+    """Queue eager preprocessing of a newly uploaded note (text, chunks, retrieval index)"""
+    note_resp = await run_query(supabase.table("notes").select("id").eq("id", note_id).single())
+    if not note_resp.data:
+        raise HTTPException(status_code=404, detail="Note not found")
+
+    task_id = await asyncio.to_thread(
+        job_store.enqueue,
+        "ingest_note",
+        {"note_id": note_id},
+        priority=INGEST_PRIORITY,
+        max_attempts=JOB_MAX_ATTEMPTS,
+        message="Queued for ingestion"
+    )
+    return {
+        "task_id": task_id,
+        "status": "queued",
+        "status_url": f"/api/podcast_status/{task_id}",
+        "events_url": f"/api/podcast_events/{task_id}"
+    }
+
+async def process_note_ingestion(task_id: str, note_id: str) -> dict:
+    """Job handler: extract, chunk and index a note so later requests only read the results."""
+    await update_task(task_id, message="Loading note", progress=0.1)
+    note_resp = await run_query(supabase.table("notes").select("file_path,updated_at").eq("id", note_id).single())
+    if not note_resp.data:
+        raise ValueError("Note not found")
+
+    # Caches the page texts and builds the index on a miss; a no-op for notes already ingested
+    await update_task(task_id, message="Extracting text", progress=0.3)
+    digest, pages = await load_note_pages(note_id, note_resp.data)
+    await update_task(task_id, message="Indexing", progress=0.8)
+    index = await asyncio.to_thread(note_indexes.get, digest, pages)
+    return {
+        "note_id": note_id,
+        "content_hash": digest,
+        "pages": len(pages),
+        "chunks": len(index.chunks)
+    }
+
 @app.post("/api/summarize_note")
 async def summarize_note(
     note_id: str = Body(...),
     format: str = Body("bullet"),
-    length: str = Body("medium")
+    length: str = Body("medium"),
+    stream: bool = Body(False),
+    refresh: bool = Body(False)
 ):
     # 1. Fetch note record from Supabase
-    note_resp = supabase.table("notes").select("file_path,title").eq("id", note_id).single().execute()
+    note_resp = await run_query(supabase.table("notes").select("file_path,title,updated_at").eq("id", note_id).single())
     if not note_resp.data:
         raise HTTPException(status_code=404, detail="Note not found")
-    file_path = note_resp.data["file_path"]
-
-    # 2. Download PDF from Supabase Storage
-    pdf_resp = requests.get(file_path)
-    if pdf_resp.status_code != 200:
-        raise HTTPException(status_code=404, detail="Could not download PDF from storage")
-    pdf_bytes = pdf_resp.content
-
-    # 3. Extract text from PDF
-    text_content = extract_text_from_pdf(pdf_bytes)
-    text_content = clean_text(text_content)
-
-    # 4. Build prompt for Groq LLM
-    prompt = f"Summarize the following content in {format} format and {length} length:\n\n{text_content[:32000]}"
-
-    # 5. Call Groq LLM
-    summary_response = client.chat.completions.create(
-        model=GROQ_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a helpful study note summarizer."},
-            {"role": "user", "content": prompt}
-        ]
+
+    # 2-3. Load note text (downloads and parses the PDF only on a cache miss)
+    digest, pages = await load_note_pages(note_id, note_resp.data)
+    text_content = join_pages(pages)
+    key = (digest, format, length, GROQ_MODEL)
+
+    async def store(summary: str, model: str) -> None:
+        # Keyed by the model that wrote it, so a fallback summary isn't served as the primary's
+        await asyncio.to_thread(summary_cache.put, note_id, digest, format, length, model, summary)
+
+    # 4. Serve a cached summary; stale ones are regenerated in the background
+    cached = None if refresh else await lookup_summary(key, text_content, store)
+    if cached is not None:
+        summary, fresh = cached
+        if stream:
+            async def replay():
+                yield sse_event("token", {"text": summary})
+                yield sse_event("done", {})
+            return sse_response(replay())
+        return {"summary": summary, "cached": True, "stale": not fresh}
+
+    # 5. Call Groq LLM (long notes are map-reduced first; only this final step depends on format/length)
+    try:
+        with stage("summarize", "condense"):
+            condensed = await summarizer.condense(text_content)
+        messages = summary_messages(condensed, format, length)
+        if stream:
+            return stream_completion(messages, on_complete=store, pipeline="summarize")
+        with stage("summarize", "llm"):
+            summary, model = await generate_summary(messages)
+    except RateLimitError:
+        raise llm_busy()
+    await store(summary, model)
+    return {"summary": summary, "cached": False, "stale": False}
+
+def summary_messages(text_content: str, format: str, length: str) -> list:
+    """Build the summary prompt for text already fitted by ``summarizer.condense``."""
+    prompt = f"Summarize the following content in {format} format and {length} length:\n\n{text_content}"
+    return [
+        {"role": "system", "content": "You are a helpful study note summarizer."},
+        {"role": "user", "content": prompt}
+    ]
+
+async def generate_summary(messages: list, priority: int = INTERACTIVE) -> Tuple[str, str]:
+    """Return the summary and the model that wrote it."""
+    summary_response = await llm.create(messages=messages, priority=priority)
+    return summary_response.choices[0].message.content.strip(), llm.served_model(summary_response)
+
+async def lookup_summary(key: tuple, text_content: str,
+                         store: Callable[[str, str], Awaitable[None]]) -> Optional[Tuple[str, bool]]:
+    """Return ``(summary, is_fresh)`` from the cache, scheduling a refresh of stale entries."""
+    cached = await asyncio.to_thread(summary_cache.get, *key)
+    if cached is not None and not cached[1] and key not in _summary_refreshes:
+        _summary_refreshes[key] = asyncio.create_task(refresh_summary(key, text_content, store))
+    return cached
+
+async def refresh_summary(key: tuple, text_content: str, store: Callable[[str, str], Awaitable[None]]) -> None:
+    """Regenerate a stale cached summary (stale-while-revalidate)."""
+    _, format, length, _ = key
+    try:
+        condensed = await summarizer.condense(text_content, priority=BACKGROUND)
+        await store(*await generate_summary(summary_messages(condensed, format, length), priority=BACKGROUND))
+        logger.info(f"Refreshed stale summary {key[0][:12]} ({format}/{length})")
+    except Exception as e:
+        logger.error(f"Failed to refresh summary: {str(e)}")
+    finally:
+        _summary_refreshes.pop(key, None)
+
+@app.post("/api/summarize_notes")
+async def summarize_notes(
+    note_ids: List[str] = Body(..., min_length=1),
+    format: str = Body("bullet"),
+    length: str = Body("medium"),
+    stream: bool = Body(True),
+    refresh: bool = Body(False)
+):
+    """Summarize several notes in one request.
+
+    The note rows come from a single Supabase query; downloads, extraction
+    and Groq calls then run concurrently within the batch limits. With
+    ``stream`` (the default) each note's result is sent as a ``result``
+    event as soon as it is ready, followed by ``done``; otherwise all
+    results are returned together in request order.
+    """
+    note_ids = list(dict.fromkeys(note_ids))
+    if len(note_ids) > SUMMARY_BATCH_MAX_NOTES:
+        raise HTTPException(status_code=400, detail=f"At most {SUMMARY_BATCH_MAX_NOTES} notes can be summarized at once")
+
+    # 1. Fetch every note record in one query
+    notes_resp = await run_query(
+        supabase.table("notes").select("id,file_path,title,updated_at").in_("id", note_ids)
     )
-    summary = summary_response.choices[0].message.content.strip()
-    return {"summary": summary}
+    notes = {str(row["id"]): row for row in notes_resp.data or []}
+
+    async def summarize_one(note_id: str) -> dict:
+        note = notes.get(note_id)
+        if note is None:
+            return {"note_id": note_id, "status": "error", "status_code": 404, "detail": "Note not found"}
+        try:
+            summary, cached, stale = await summarize_batch_note(note_id, note, format, length, refresh)
+        except RateLimitError:
+            busy = llm_busy()
+            return {"note_id": note_id, "status": "error", "status_code": busy.status_code,
+                    "detail": busy.detail, "retry_after": int(busy.headers["Retry-After"])}
+        except HTTPException as e:
+            return {"note_id": note_id, "status": "error", "status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            logger.error(f"Failed to summarize note {note_id}: {str(e)}", exc_info=True)
+            return {"note_id": note_id, "status": "error", "status_code": 500, "detail": str(e)}
+        return {"note_id": note_id, "status": "ok", "title": note.get("title"),
+                "summary": summary, "cached": cached, "stale": stale}
+
+    if not stream:
+        return {"results": await asyncio.gather(*[summarize_one(note_id) for note_id in note_ids])}
+
+    async def events():
+        tasks = [asyncio.create_task(summarize_one(note_id)) for note_id in note_ids]
+        failed = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                failed += result["status"] != "ok"
+                yield sse_event("result", result)
+            yield sse_event("done", {"completed": len(tasks) - failed, "failed": failed})
+        finally:
+            # The client went away; don't keep downloading and calling Groq for it
+            for task in tasks:
+                task.cancel()
+
+    return sse_response(events())
+
+async def summarize_batch_note(note_id: str, note: dict, format: str, length: str,
+                               refresh: bool) -> Tuple[str, bool, bool]:
+    """Summarize one note of a batch; returns ``(summary, cached, stale)``."""
+    if not note.get("file_path"):
+        raise HTTPException(status_code=400, detail="Note has no associated file")
+    async with batch_fetch_slots:
+        digest, pages = await load_note_pages(note_id, note)
+    text_content = join_pages(pages)
+    key = (digest, format, length, GROQ_MODEL)
+
+    async def store(summary: str, model: str) -> None:
+        await asyncio.to_thread(summary_cache.put, note_id, digest, format, length, model, summary)
+
+    cached = None if refresh else await lookup_summary(key, text_content, store)
+    if cached is not None:
+        return cached[0], True, not cached[1]
+
+    # Chunk calls inside condense are already bounded by the summarizer
+    with stage("summarize", "condense"):
+        condensed = await summarizer.condense(text_content, priority=BULK)
+    async with batch_llm_limiter.slot():
+        with stage("summarize", "llm"):
+            summary, model = await generate_summary(summary_messages(condensed, format, length), priority=BULK)
+    await store(summary, model)
+    return summary, False, False
 
 @app.post("/api/chat")
 async def chat_with_note(
     request: Request,
     note_id: str = Body(..., embed=True, min_length=1, description="The ID of the note to chat about"),
     question: str = Body(..., embed=True, min_length=1, description="The user's question"),
-    history: list = Body(default=[], embed=True, description="Chat history for context")
+    session_id: Optional[str] = Body(default=None, embed=True, description="Conversation to continue, from an earlier answer"),
+    history: list = Body(default=[], embed=True, description="Earlier turns, used only to seed a new conversation"),
+    stream: bool = Body(default=False, embed=True, description="Stream the answer as server-sent events")
 ):
     logger.info(f"=== New Chat Request ===")
     logger.info(f"Note ID: {note_id}")
@@ -324,83 +968,79 @@ async def chat_with_note(
             logger.error("Invalid question provided")
             raise HTTPException(status_code=400, detail="A valid question is required")
 
-        # 2. Fetch note record from Supabase
-        try:
-            logger.info(f"Fetching note {note_id} from database...")
-            note_resp = supabase.table("notes").select("file_path,title").eq("id", note_id).single().execute()
-            
-            if not note_resp.data:
-                logger.error(f"Note {note_id} not found in database")
-                raise HTTPException(status_code=404, detail="Note not found")
-                
-            file_path = note_resp.data.get("file_path")
-            note_title = note_resp.data.get("title", "Untitled Note")
-            
-            if not file_path:
-                logger.error(f"Note {note_id} has no file_path")
-                raise HTTPException(status_code=400, detail="Note has no associated file")
-                
-            logger.info(f"Found note: {note_title} (File: {file_path})")
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            error_msg = f"Database error: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            raise HTTPException(status_code=500, detail=error_msg)
+        # 2. Resume the conversation; its note was resolved and indexed on the first turn
+        session = await asyncio.to_thread(chat_sessions.get, session_id) if session_id else None
+        if session is not None and session["note_id"] != note_id:
+            logger.info(f"Session {session_id} belongs to another note; starting a new one")
+            session = None
+        index = None
+        if session is not None:
+            digest = session["digest"]
+            index = await asyncio.to_thread(note_indexes.get, digest)
+            note_title = session["title"] or "Untitled Note"
 
-        # 3. Download PDF from Supabase Storage
-        try:
-            logger.info(f"Downloading PDF from: {file_path}")
-            pdf_resp = requests.get(file_path, timeout=15)  # Increased timeout
-            pdf_resp.raise_for_status()
-            pdf_bytes = pdf_resp.content
-            
-            if not pdf_bytes:
-                raise ValueError("Downloaded PDF is empty")
+        if index is None:
+            # 3. Fetch note record from Supabase
+            try:
+                logger.info(f"Fetching note {note_id} from database...")
+                note_resp = await run_query(
+                    supabase.table("notes").select("file_path,title,updated_at").eq("id", note_id).single()
+                )
                 
-            logger.info("Successfully downloaded PDF file")
-            
-        except requests.Timeout:
-            error_msg = "Timed out while downloading PDF"
-            logger.error(error_msg)
-            raise HTTPException(status_code=504, detail=error_msg)
-            
-        except requests.RequestException as e:
-            error_msg = f"Error downloading PDF: {str(e)}"
-            logger.error(error_msg)
-            status_code = 404 if isinstance(e, requests.HTTPError) and e.response.status_code == 404 else 500
-            raise HTTPException(status_code=status_code, detail=error_msg)
-
-        # 4. Extract text from PDF
-        try:
-            logger.info("Extracting text from PDF...")
-            text_content = extract_text_from_pdf(pdf_bytes)
-            
-            if not text_content or not isinstance(text_content, str):
-                raise ValueError("Failed to extract text from PDF")
+                if not note_resp.data:
+                    logger.error(f"Note {note_id} not found in database")
+                    raise HTTPException(status_code=404, detail="Note not found")
+                    
+                file_path = note_resp.data.get("file_path")
+                note_title = note_resp.data.get("title", "Untitled Note")
                 
-            text_content = clean_text(text_content)
-            
-            if not text_content.strip():
-                raise ValueError("Extracted text is empty")
+                if not file_path:
+                    logger.error(f"Note {note_id} has no file_path")
+                    raise HTTPException(status_code=400, detail="Note has no associated file")
+                    
+                logger.info(f"Found note: {note_title} (File: {file_path})")
                 
-            logger.info(f"Extracted {len(text_content)} characters from PDF")
-            
-        except Exception as e:
-            error_msg = f"Error processing PDF: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            raise HTTPException(status_code=400, detail=error_msg)
+            except HTTPException:
+                raise
+            except Exception as e:
+                error_msg = f"Database error: {str(e)}"
+                logger.error(error_msg, exc_info=True)
+                raise HTTPException(status_code=500, detail=error_msg)
+
+            # 4. Load note pages (downloads and parses the PDF only on a cache miss)
+            digest, pages = await load_note_pages(note_id, note_resp.data)
+            index = await asyncio.to_thread(note_indexes.get, digest, pages)
+
+            if session is None:
+                session = await start_chat_session(note_id, digest, note_title, history, question)
 
         # 5. Build prompt for Groq LLM
         try:
             logger.info("Building prompt for Groq LLM...")
+            session_id = session["session_id"]
+            turns = await asyncio.to_thread(chat_sessions.unsummarized, session_id)
+            # Turns that don't fit are dropped here and folded into the summary after this answer
+            summary = session["summary"]
+            budget = CHAT_HISTORY_TOKENS - (estimate_tokens(summary) if summary else 0)
+            _, recent = history_window(turns, max(budget, 0))
+
+            # Opening questions are often asked many times about the same notes
+            use_answer_cache = not turns and not summary
+            if use_answer_cache:
+                cached = await asyncio.to_thread(answer_cache.get, digest, GROQ_MODEL, question)
+                if cached is not None:
+                    logger.info("Serving answer from the answer cache")
+                    return await replay_cached_answer(session_id, question, *cached, stream=stream)
+            else:
+                answer_cache.skip()
             
-            # Truncate content to fit within token limits
-            max_content_length = 32000
-            if len(text_content) > max_content_length:
-                logger.warning(f"Truncating note content from {len(text_content)} to {max_content_length} characters")
-                text_content = text_content[:max_content_length]
+            # Retrieve only the passages relevant to this question; the previous
+            # question gives follow-ups like "why is that?" something to match
+            previous = next((t["content"] for t in reversed(turns) if t["role"] == "user"), "")
+            with stage("chat", "retrieve"):
+                passages = index.search(f"{previous} {question}" if previous else question, top_k=RAG_TOP_K)
+            logger.info(f"Retrieved {len(passages)} of {len(index.chunks)} chunks for the question")
+            context = "\n\n".join(f"[Page {p['page']}] {p['text']}" for p in passages)
             
             system_prompt = (
                 "You are an expert study assistant. Answer questions about the provided note content. "
@@ -408,44 +1048,61 @@ async def chat_with_note(
                 f"The note is titled: {note_title}"
             )
             
-            user_prompt = f"""Note Content:
-{text_content}
+            user_prompt = f"""Relevant excerpts from the note:
+{context}
 
 Question: {question}
 
-Please provide a detailed answer based on the note content above."""
+Please provide a detailed answer based on the note excerpts above."""
             
             # Build messages array
             messages = [{"role": "system", "content": system_prompt}]
+            if summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
             
-            # Add conversation history if available
-            if history and isinstance(history, list):
-                for msg in history:
-                    if (isinstance(msg, dict) and 
-                        msg.get("role") in ["user", "assistant"] and 
-                        msg.get("content") and 
-                        isinstance(msg["content"], str)):
-                        
-                        messages.append({
-                            "role": msg["role"], 
-                            "content": msg["content"][:2000]  # Limit history length
-                        })
+            # Recent turns verbatim, as plain questions and answers without their excerpts
+            messages.extend({"role": t["role"], "content": t["content"]} for t in recent)
             
-            # Add current question
-            messages.append({"role": "user", "content": question})
+            # Add current question, grounded in the retrieved excerpts
+            messages.append({"role": "user", "content": user_prompt})
             
-            logger.info(f"Sending request to Groq with {len(messages)} messages")
+            logger.info(f"Sending request to Groq with {len(messages)} messages "
+                        f"({len(recent)} of {len(turns)} recent turns, summary: {bool(summary)})")
+
+            # Cite the passages the answer was grounded in
+            sources = [{
+                "text": p["text"][:300],
+                "page": p["page"],
+                "document": f"{note_title}.pdf"
+            } for p in passages]
+
+            async def record(answer: str, model: str) -> None:
+                await record_chat_turn(session_id, question, answer)
+                # Keyed by the model that answered, so a fallback answer isn't served as the primary's
+                if use_answer_cache:
+                    await asyncio.to_thread(answer_cache.put, digest, model, question, answer, sources)
 
             # 6. Call Groq LLM
-            try:
-                response = client.chat.completions.create(
-                    model=GROQ_MODEL,
-                    messages=messages,
+            if stream:
+                return stream_completion(
+                    messages,
+                    trailer=("sources", {"sources": sources, "session_id": session_id}),
+                    on_complete=record,
+                    pipeline="chat",
                     max_tokens=1500,
                     temperature=0.7,
                     top_p=0.9,
-                    timeout=30  # seconds
+                    timeout=30
                 )
+            try:
+                with stage("chat", "llm"):
+                    response = await llm.create(
+                        messages=messages,
+                        max_tokens=1500,
+                        temperature=0.7,
+                        top_p=0.9,
+                        timeout=30  # seconds
+                    )
                 
                 if not response.choices or not response.choices[0].message.content:
                     raise ValueError("Empty response from AI model")
@@ -453,24 +1110,24 @@ Please provide a detailed answer based on the note content above."""
                 answer = response.choices[0].message.content.strip()
                 logger.info("Successfully received response from Groq")
                 
-                # Simple source citation (can be enhanced with RAG in the future)
-                sources = [{
-                    "text": "Answer is based on the provided note content.",
-                    "page": 1,
-                    "document": f"{note_title}.pdf"
-                }]
-                
-                logger.info("Returning successful response")
-                return {
-                    "answer": answer,
-                    "sources": sources
-                }
-                
+            except RateLimitError:
+                raise llm_busy()
             except Exception as e:
                 error_msg = f"Groq API error: {str(e)}"
                 logger.error(error_msg, exc_info=True)
                 raise HTTPException(status_code=502, detail=error_msg)
+
+            await record(answer, llm.served_model(response))
+            logger.info("Returning successful response")
+            return {
+                "answer": answer,
+                "sources": sources,
+                "session_id": session_id,
+                "cached": False
+            }
             
+        except HTTPException:
+            raise
         except Exception as e:
             error_msg = f"Error in chat processing: {str(e)}"
             logger.error(error_msg, exc_info=True)
@@ -486,75 +1143,208 @@ Please provide a detailed answer based on the note content above."""
         logger.error(error_msg, exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected error occurred. Please try again later.")
 
-async def process_podcast_creation(
-    task_id: str,
-    file_path: str,
-    model: str,
-    original_filename: str
-):
+async def replay_cached_answer(session_id: str, question: str, answer: str, sources: list, stream: bool):
+    """Answer from the answer cache, in the same shape as a fresh answer."""
+    await record_chat_turn(session_id, question, answer)
+    if stream:
+        async def replay():
+            yield sse_event("token", {"text": answer})
+            yield sse_event("sources", {"sources": sources, "session_id": session_id})
+            yield sse_event("done", {})
+        return sse_response(replay())
+    return {"answer": answer, "sources": sources, "session_id": session_id, "cached": True}
+
+async def start_chat_session(note_id: str, digest: str, title: str, history: list, question: str) -> dict:
+    """Open a conversation about a note, seeded with any history the client sent."""
+    seed = [
+        (msg["role"], msg["content"]) for msg in history
+        if isinstance(msg, dict) and msg.get("role") in ["user", "assistant"]
+        and msg.get("content") and isinstance(msg["content"], str)
+    ]
+    # Older clients include the question being asked as the last history entry
+    if seed and seed[-1] == ("user", question):
+        seed.pop()
+    session_id = await asyncio.to_thread(chat_sessions.create, note_id, digest, title)
+    if seed:
+        await asyncio.to_thread(chat_sessions.add_turns, session_id, seed)
+    logger.info(f"Started chat session {session_id} for note {note_id} ({len(seed)} seeded turns)")
+    return await asyncio.to_thread(chat_sessions.get, session_id)
+
+async def record_chat_turn(session_id: str, question: str, answer: str) -> None:
+    """Store a completed exchange and compact the session once its history outgrows the budget."""
+    await asyncio.to_thread(chat_sessions.add_turns, session_id, [("user", question), ("assistant", answer)])
+    turns = await asyncio.to_thread(chat_sessions.unsummarized, session_id)
+    if sum(t["tokens"] for t in turns) > CHAT_HISTORY_TOKENS and session_id not in _session_compactions:
+        _session_compactions[session_id] = asyncio.create_task(compact_chat_session(session_id))
+
+async def compact_chat_session(session_id: str) -> None:
+    """Fold older turns into the session's running summary (off the request path)."""
     try:
-        # 1. Extract text from PDF
-        TASKS[task_id].update({
-            "message": "Extracting text from PDF",
-            "progress": 0.2
-        })
-        with open(file_path, "rb") as f:
-            text_content = extract_text_from_pdf(f.read())
-        text_content = clean_text(text_content)
-        
-        # 2. Generate podcast script using Groq
-        TASKS[task_id].update({
-            "message": "Generating podcast script",
-            "progress": 0.4
-        })
-        script = generate_podcast_script(client, text_content, model)
-        
-        # 3. Generate audio (Edge TTS)
-        TASKS[task_id].update({
-            "message": "Generating audio",
-            "progress": 0.8
-        })
-        audio_path = None
+        session = await asyncio.to_thread(chat_sessions.get, session_id)
+        if session is None:
+            return
+        turns = await asyncio.to_thread(chat_sessions.unsummarized, session_id)
+        # Keep half the budget verbatim so this runs every few turns rather than every turn
+        older, _ = history_window(turns, CHAT_HISTORY_TOKENS // 2)
+        if not older:
+            return
+        transcript = "\n".join(f"{t['role'].capitalize()}: {t['content']}" for t in older)
+        prompt = CHAT_SUMMARY_PROMPT.format(summary=session["summary"] or "(none yet)", transcript=transcript)
+        with stage("chat", "compact"):
+            response = await llm.create(
+                priority=BACKGROUND,
+                messages=[
+                    {"role": "system", "content": "You keep concise running summaries of study conversations."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+                temperature=0.2
+            )
+        summary = response.choices[0].message.content.strip() if response.choices else ""
+        if summary:
+            await asyncio.to_thread(chat_sessions.set_summary, session_id, summary, older[-1]["seq"])
+            logger.info(f"Summarized {len(older)} turns of chat session {session_id}")
+    except Exception as e:
+        logger.error(f"Failed to compact chat session {session_id}: {str(e)}")
+    finally:
+        _session_compactions.pop(session_id, None)
+
+@app.delete("/api/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """Forget a conversation and its history"""
+    if not await asyncio.to_thread(chat_sessions.delete, session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return {"session_id": session_id, "deleted": True}
+
+async def process_podcast_creation(task_id: str, file_path: str, model: str, original_filename: str) -> dict:
+    """Job handler: turn an uploaded PDF into a podcast MP3."""
+    audio_path = await generate_podcast_audio(task_id, file_path, model)
+    await asyncio.to_thread(
+        save_podcast_metadata,
+        task_id=task_id,
+        metadata={
+            "original_filename": original_filename,
+            "output_path": audio_path,
+            "status": "completed"
+        }
+    )
+    return {
+        "audio_path": audio_path,
+        "audio_url": f"/get_podcast/{task_id}"
+    }
+
+async def generate_podcast_audio(task_id: str, file_path: Optional[str], model: str,
+                                 text_content: Optional[str] = None) -> str:
+    """Turn a PDF (or already extracted text) into a podcast MP3 and return its path."""
+    # 1. Extract text from PDF (skipped when the caller already has it)
+    await update_task(task_id, message="Extracting text from PDF", progress=0.2)
+    if text_content is None:
+        pdf_bytes = await asyncio.to_thread(_read_file, file_path)
+        with stage("podcast", "extract"):
+            text_content = await asyncio.to_thread(_extract_clean_text, pdf_bytes)
+    
+    # 2. Generate podcast script using Groq, condensing notes longer than the prompt window
+    if len(text_content) > summarizer.window_chars:
+        await update_task(task_id, message="Condensing long document", progress=0.3)
+        with stage("podcast", "condense"):
+            text_content = await summarizer.condense(text_content, priority=BACKGROUND)
+    await update_task(task_id, message="Generating podcast script", progress=0.4)
+    with stage("podcast", "script"):
+        # Script generation runs in threads; its calls join the gateway's background lane
+        script_client = llm.blocking(asyncio.get_running_loop(), priority=BACKGROUND)
+        script = await asyncio.to_thread(generate_podcast_script, script_client, text_content, model)
+    
+    # 3. Generate audio (Edge TTS); create_audio raises, failing the job, if it can't finish
+    await update_task(task_id, message="Generating audio", progress=0.5)
+    last_report = 0.0
+
+    async def report_audio_progress(done: int, total: int) -> None:
+        # Throttled so a long script doesn't turn into a write per chunk
+        nonlocal last_report
+        now = asyncio.get_running_loop().time()
+        if done < total and now - last_report < JOB_PROGRESS_INTERVAL:
+            return
+        last_report = now
         try:
-            audio_path = await create_audio(script, task_id)
-        except Exception as e:
-            logger.error(f"create_audio failed: {e}", exc_info=True)
-            # Fallback: create 2-second silent audio
-            from pydub import AudioSegment
-            silent = AudioSegment.silent(duration=2000)
-            os.makedirs("podcasts", exist_ok=True)
-            audio_path = f"podcasts/podcast_{task_id}.mp3"
-            silent.export(audio_path, format="mp3")
-            logger.info(f"Silent fallback audio saved to {audio_path}")
-        finally:
-            # 4. Save metadata and update status regardless of error
-            save_podcast_metadata(
-                task_id=task_id,
-                metadata={
-                    "original_filename": original_filename,
-                    "output_path": audio_path,
-                    "status": "completed"
-                }
+            await update_task(
+                task_id,
+                message=f"Generating audio ({done}/{total} chunks)",
+                progress=0.5 + 0.45 * done / total,
+                detail={"chunks_done": done, "chunks_total": total},
             )
-            TASKS[task_id].update({
-                "status": "completed",
-                "message": "Podcast created successfully",
-                "progress": 1.0,
-                "audio_path": audio_path,
-                "audio_url": f"/get_podcast/{task_id}"
-            })
-        
+        except Exception as e:
+            logger.warning(f"Could not record progress for task {task_id}: {str(e)}")
+
+    with stage("podcast", "audio"):
+        return await create_audio(script, task_id, on_progress=report_audio_progress)
+
+JOB_HANDLERS = {
+    "podcast_from_upload": process_podcast_creation,
+    "podcast_from_note": process_note_podcast,
+    "ingest_note": process_note_ingestion,
+}
+
+# Completion message per job kind (podcast jobs use the default)
+JOB_COMPLETION_MESSAGES = {
+    "ingest_note": "Note ingested",
+}
+
+async def run_job(job: dict) -> None:
+    """Run a claimed job, then mark it completed, re-queued or failed."""
+    task_id = job["id"]
+    payload = job["payload"]
+    owner = _job_owners[task_id] = job["locked_by"]
+    try:
+        handler = JOB_HANDLERS.get(job["kind"])
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        result = await handler(task_id, **payload)
+        message = JOB_COMPLETION_MESSAGES.get(job["kind"], "Podcast created successfully")
+        await asyncio.to_thread(job_store.complete, task_id, result, message, owner)
+    except (asyncio.CancelledError, LeaseLost):
+        # Worker shutting down, or the job now belongs to another worker; either way this run stops here
+        raise
     except Exception as e:
-        logger.error(f"Error processing podcast: {str(e)}")
-        TASKS[task_id].update({
-            "status": "failed",
-            "message": f"Error: {str(e)}",
-            "progress": 0
-        })
+        logger.error(f"Error processing {job['kind']} job {task_id}: {str(e)}", exc_info=True)
+        try:
+            requeued = await asyncio.to_thread(job_store.fail, task_id, str(e), owner)
+        except LeaseLost:
+            raise
+        except Exception as fail_error:
+            # The lease runs out and the job is retried or expired; nothing more to record here
+            logger.error(f"Could not record the failure of job {task_id}: {str(fail_error)}")
+            return
+        if requeued:
+            logger.info(f"Job {task_id} re-queued (attempt {job['attempts']} of {job['max_attempts']})")
+            return
+        await finish_failed_job(job, str(e))
+        return
     finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
+        _job_owners.pop(task_id, None)
+    remove_job_upload(job)
+
+async def finish_failed_job(job: dict, error: Optional[str] = None) -> None:
+    """Record a job's final failure in the podcast metadata and clean up after it."""
+    payload = job["payload"]
+    if job["kind"].startswith("podcast_"):
+        failure = {"status": "failed", "error": error or job.get("error")}
+        for key in ("user_id", "note_id"):
+            if payload.get(key):
+                failure[key] = payload[key]
+        try:
+            await asyncio.to_thread(save_podcast_metadata, task_id=job["id"], metadata=failure)
+        except Exception as e:
+            logger.error(f"Could not save failure metadata for job {job['id']}: {str(e)}")
+    remove_job_upload(job)
+
+def remove_job_upload(job: dict) -> None:
+    """Delete the uploaded file once the job will not run again."""
+    file_path = job["payload"].get("file_path")
+    try:
+        if file_path and os.path.exists(file_path):
             os.remove(file_path)
+    except OSError as e:
+        logger.warning(f"Could not remove upload {file_path}: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn, os
@@ -0,0 +1,90 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+def naive_seek(client: httpx.Client, url: str, position: int, window: int) -> int:
+    """Seek like a client without range support: download from byte 0 up to the seek point plus the played window."""
+    received = 0
+    with client.stream("GET", url) as response:
+        for data in response.iter_bytes():
+            received += len(data)
+            if received >= position + window:
+                break
+    return received
+
+def range_seek(client: httpx.Client, url: str, position: int, window: int) -> tuple:
+    """Seek with a byte range; returns (bytes received, status code)."""
+    response = client.get(url, headers={"Range": f"bytes={position}-{position + window - 1}"})
+    return len(response.content), response.status_code
+
+def run_benchmark(task_id: str, seeks: int, window_kb: int, seed: int) -> bool:
+    """Replay one seek-heavy listening session with and without range requests.
+
+    Every seek jumps to a random offset and plays ``window_kb`` of audio. The
+    session ends with a revisit of the episode using the cached ETag, which
+    should cost a 304 and no body.
+    """
+    api_url = os.getenv('VITE_API_URL', 'http://localhost:8006')
+    url = f"{api_url.rstrip('/')}/get_podcast/{task_id}"
+    print(f"📤 Benchmarking seeks against: {url}")
+
+    window = window_kb * 1024
+    rng = random.Random(seed)
+
+    with httpx.Client(timeout=60) as client:
+        head = client.head(url)
+        if head.status_code != 200:
+            print(f"❌ Podcast not available (status {head.status_code}); is it completed?")
+            return False
+        size = int(head.headers["content-length"])
+        etag = head.headers.get("etag")
+        print(f"   Episode size: {size / 1024:.0f} KB, ETag: {etag}, Cache-Control: {head.headers.get('cache-control')}")
+        positions = [rng.randrange(0, max(size - window, 1)) for _ in range(seeks)]
+
+        start = time.perf_counter()
+        naive_bytes = sum(naive_seek(client, url, pos, window) for pos in positions)
+        naive_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = [range_seek(client, url, pos, window) for pos in positions]
+        range_time = time.perf_counter() - start
+        range_bytes = sum(received for received, _ in results)
+        partial = sum(1 for _, status in results if status == 206)
+
+        revisit = client.get(url, headers={"If-None-Match": etag} if etag else {})
+
+    print(f"\n📥 {seeks} seeks, {window_kb} KB played after each")
+    print(f"   Without ranges: {naive_bytes / 1024:>10.0f} KB in {naive_time:.2f}s")
+    print(f"   With ranges:    {range_bytes / 1024:>10.0f} KB in {range_time:.2f}s ({partial}/{seeks} answered 206)")
+    if range_bytes:
+        print(f"   Reduction:      {naive_bytes / range_bytes:.1f}x fewer bytes")
+    print(f"   Revisit with ETag: status {revisit.status_code}, {len(revisit.content)} bytes")
+
+    return partial == seeks and revisit.status_code == 304 and range_bytes < naive_bytes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare bytes served for a seek-heavy listening session')
+    parser.add_argument('--task-id', type=str, required=True, help='Task ID of a completed podcast')
+    parser.add_argument('--seeks', type=int, default=20, help='Number of seeks in the session')
+    parser.add_argument('--window-kb', type=int, default=64, help='KB of audio played after each seek')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for seek positions')
+
+    args = parser.parse_args()
+
+    print("🔍 Benchmarking podcast seeking...\n")
+
+    success = run_benchmark(args.task_id, args.seeks, args.window_kb, args.seed)
+
+    if not success:
+        print("\n❌ Range or conditional requests were not honoured. See the numbers above.")
+        sys.exit(1)
+    else:
+        print("\n✅ Seeks were served as partial content and revisits as 304!")
@@ -0,0 +1,455 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+# Words for generated study notes; seeded so every run produces the same PDFs
+VOCABULARY = (
+    "photosynthesis chlorophyll mitochondria enzyme catalyst equilibrium entropy momentum velocity "
+    "acceleration gravity orbit electron proton neutron molecule polymer protein genome mutation "
+    "evolution ecosystem biome climate erosion sediment tectonic volcano magma revolution empire "
+    "treaty parliament democracy economy inflation supply demand market theorem proof integral "
+    "derivative matrix vector probability variance algorithm recursion compiler network protocol"
+).split()
+
+STUB_ANSWER = (
+    "Based on the notes, the key idea is that energy is conserved while entropy tends to increase. "
+    "The notes give photosynthesis and cellular respiration as complementary examples, and they "
+    "stress that equilibrium is dynamic rather than static."
+)
+
+def make_paragraph(rng: random.Random, sentences: int) -> str:
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 16))]
+        out.append(" ".join(words).capitalize() + ".")
+    return " ".join(out)
+
+def create_benchmark_pdf(path: str, pages: int, seed: int) -> None:
+    """Write a ``pages``-page PDF of generated study notes (same drawing code as create_test_pdf.py)."""
+    rng = random.Random(seed)
+    c = canvas.Canvas(path, pagesize=letter)
+    for page in range(pages):
+        c.setFont("Helvetica", 12)
+        c.drawString(72, 750, f"Chapter {page + 1}: {rng.choice(VOCABULARY).capitalize()}")
+        y = 720
+        line = []
+        for word in make_paragraph(rng, 24).split():
+            line.append(word)
+            if len(line) == 12:
+                c.drawString(72, y, " ".join(line))
+                line = []
+                y -= 20
+        if line:
+            c.drawString(72, y, " ".join(line))
+        c.showPage()
+    c.save()
+
+def distinct_question(i: int) -> str:
+    """The ``i``-th of a set of questions different enough to miss the answer cache."""
+    first = VOCABULARY[i % len(VOCABULARY)]
+    second = VOCABULARY[(i * 7 + 3) % len(VOCABULARY)]
+    return f"Which pages discuss {first} together with {second}?"
+
+def make_script(lines: int, seed: int) -> str:
+    """A host/guest podcast script; the seed makes its text (and so its TTS cache keys) unique."""
+    rng = random.Random(seed)
+    return "\n".join(
+        f"{'Host' if i % 2 == 0 else 'Guest'}: {make_paragraph(rng, rng.randint(2, 5))}" for i in range(lines)
+    )
+
+class StandInLatency:
+    """Simulated upstream latencies in seconds (per call, per streamed token, per TTS chunk)."""
+
+    def __init__(self, groq: float, groq_token: float, supabase: float, storage: float, tts: float):
+        self.groq = groq
+        self.groq_token = groq_token
+        self.supabase = supabase
+        self.storage = storage
+        self.tts = tts
+
+def build_stand_in(latency: StandInLatency, notes: Dict[str, dict], files: Dict[str, bytes]) -> FastAPI:
+    """One local server answering the Supabase REST, Supabase Storage and Groq endpoints the app uses."""
+    stand_in = FastAPI()
+    stand_in.state.llm_calls = 0
+
+    @stand_in.get("/rest/v1/notes")
+    async def select_note(request: Request):
+        await asyncio.sleep(latency.supabase)
+        note_id = request.query_params.get("id", "").removeprefix("eq.")
+        note = notes.get(note_id)
+        if note is None:
+            return JSONResponse({"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned",
+                                 "details": "The result contains 0 rows", "hint": None}, status_code=406)
+        columns = request.query_params.get("select", "*")
+        row = note if columns == "*" else {col: note.get(col) for col in columns.split(",")}
+        return JSONResponse(row)
+
+    @stand_in.get("/storage/v1/object/public/pdf-files/{name}")
+    async def download(name: str, request: Request):
+        await asyncio.sleep(latency.storage)
+        content = files.get(name)
+        if content is None:
+            return Response(status_code=404)
+        etag = f'"{name}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content, media_type="application/pdf", headers={"ETag": etag})
+
+    @stand_in.post("/openai/v1/chat/completions")
+    async def chat_completion(request: Request):
+        body = await request.json()
+        stand_in.state.llm_calls += 1
+        await asyncio.sleep(latency.groq)
+        created = int(time.time())
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": created, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": STUB_ANSWER},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+
+        async def tokens():
+            for word in STUB_ANSWER.split(" "):
+                chunk = {
+                    "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": created,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(latency.groq_token)
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(tokens(), media_type="text/event-stream")
+
+    return stand_in
+
+def start_stand_in(stand_in: FastAPI) -> str:
+    """Serve the stand-in from a background thread; returns its base URL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(stand_in, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Stand-in server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+def peak_rss_mb() -> float:
+    """Peak resident set size so far of this process plus its reaped children (the PDF extraction pool)."""
+    scale = 1 if platform.system() == "Darwin" else 1024  # ru_maxrss is bytes on macOS, KB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak * scale / (1024 * 1024)
+
+def summarize_samples(samples: List[float], wall: float, units: float, unit: str) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+        "ops_per_s": round(len(samples) / wall, 2) if wall else None,
+        f"{unit}_per_s": round(units / wall, 2) if wall else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def time_sync(fn: Callable[[], object], iterations: int) -> tuple:
+    """Run ``fn`` ``iterations`` times, discarding its log output; returns (latencies, wall time, last result)."""
+    samples = []
+    result = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - t0)
+        wall = time.perf_counter() - start
+    return samples, wall, result
+
+async def time_requests(make_request: Callable[[int], object], count: int, concurrency: int) -> tuple:
+    """Issue ``count`` requests with at most ``concurrency`` in flight; returns (latencies, wall time)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            t0 = time.perf_counter()
+            response = await make_request(i)
+            samples.append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                raise RuntimeError(f"Request failed with {response.status_code}: {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(count)])
+    return samples, time.perf_counter() - start
+
+def report(results: Dict[str, dict], name: str, stats: dict) -> None:
+    results[name] = stats
+    print(f"   {name:<34} p50 {stats['p50_ms']:>9.1f} ms   p95 {stats['p95_ms']:>9.1f} ms   "
+          f"{stats['ops_per_s'] or 0:>8.1f} ops/s   RSS {stats['peak_rss_mb']:.0f} MB")
+
+async def run_pipeline_benchmarks(args, pdfs: Dict[int, List[str]], stand_in: FastAPI) -> Dict[str, dict]:
+    if not args.verbose:
+        # Per-request logging would swamp the report and skew the timings
+        logging.disable(logging.INFO)
+    # Imported only now: the app reads the stand-in URLs and cache paths from the environment at import time
+    import app as eduai
+    import podcast_generator
+    from podcast_generator import create_audio, silent_mp3, split_text_for_tts
+    from utils import clean_text, extract_text_from_pdf
+
+    async def stand_in_edge_tts(text: str, voice: str) -> bytes:
+        # Edge TTS speaks a websocket protocol to a fixed Microsoft endpoint, so it is replaced in-process
+        await asyncio.sleep(args.tts_latency / 1000)
+        return silent_mp3(min(len(text) * 60, 15000))
+
+    podcast_generator.stream_edge_tts = stand_in_edge_tts
+
+    results: Dict[str, dict] = {}
+    transport = httpx.ASGITransport(app=eduai.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://eduai", timeout=600) as api:
+        for pages, names in pdfs.items():
+            print(f"\n📄 {pages}-page notes")
+            with open(os.path.join(args.workdir, "files", names[0]), "rb") as f:
+                pdf_bytes = f.read()
+
+            samples, wall, text = time_sync(lambda: extract_text_from_pdf(pdf_bytes), args.iterations)
+            report(results, f"extract_text_from_pdf[{pages}p]", summarize_samples(samples, wall, pages * len(samples), "pages"))
+
+            samples, wall, cleaned = time_sync(lambda: clean_text(text), args.iterations)
+            report(results, f"clean_text[{pages}p]", summarize_samples(samples, wall, len(text) * len(samples), "chars"))
+
+            samples, wall, chunks = time_sync(lambda: split_text_for_tts(cleaned), args.iterations)
+            report(results, f"split_text_for_tts[{pages}p]", summarize_samples(samples, wall, len(chunks) * len(samples), "chunks"))
+
+            question = "How does the note relate entropy and equilibrium?"
+
+            # Cold: every note has its own PDF, so each request downloads, parses and indexes it
+            with contextlib.redirect_stdout(io.StringIO()):
+                samples, wall = await time_requests(
+                    lambda i: api.post("/api/chat", json={"note_id": f"{pages}-{i}", "question": question}),
+                    len(names), 1
+                )
+            report(results, f"chat_cold[{pages}p]", summarize_samples(samples, wall, pages * len(samples), "pages"))
+
+            # Warm: the note is cached, but every question is new and goes to Groq
+            samples, wall = await time_requests(
+                lambda i: api.post("/api/chat", json={"note_id": f"{pages}-0", "question": distinct_question(i)}),
+                args.requests, args.concurrency
+            )
+            report(results, f"chat_warm[{pages}p]", summarize_samples(samples, wall, len(samples), "requests"))
+
+            # Many students opening with the same question are served from the answer cache
+            samples, wall = await time_requests(
+                lambda i: api.post("/api/chat", json={"note_id": f"{pages}-0", "question": question}),
+                args.requests, args.concurrency
+            )
+            report(results, f"chat_repeated[{pages}p]", summarize_samples(samples, wall, len(samples), "requests"))
+
+            # Follow-up turns in one conversation skip the note lookup and carry budgeted history
+            first = await api.post("/api/chat", json={"note_id": f"{pages}-0", "question": question})
+            session_id = first.json()["session_id"]
+            samples, wall = await time_requests(
+                lambda i: api.post("/api/chat", json={"note_id": f"{pages}-0", "session_id": session_id,
+                                                      "question": f"Can you expand on point {i + 1}?"}),
+                args.requests, 1
+            )
+            report(results, f"chat_session[{pages}p]", summarize_samples(samples, wall, len(samples), "requests"))
+
+            samples, wall = await time_requests(
+                lambda i: api.post("/api/summarize_note", json={"note_id": f"{pages}-{i % len(names)}", "refresh": True}),
+                args.requests, args.concurrency
+            )
+            report(results, f"summarize_uncached[{pages}p]", summarize_samples(samples, wall, len(samples), "requests"))
+
+            samples, wall = await time_requests(
+                lambda i: api.post("/api/summarize_note", json={"note_id": f"{pages}-0"}),
+                args.requests, args.concurrency
+            )
+            report(results, f"summarize_cached[{pages}p]", summarize_samples(samples, wall, len(samples), "requests"))
+
+        print(f"\n🎙️  {args.script_lines}-line podcast script")
+        samples = []
+        jobs = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for i in range(args.audio_runs):
+                script = make_script(args.script_lines, seed=args.seed + i)
+                jobs += sum(len(split_text_for_tts(line.split(":", 1)[1])) for line in script.splitlines())
+                t0 = time.perf_counter()
+                path = await create_audio(script, f"bench-{i}")
+                samples.append(time.perf_counter() - t0)
+                os.remove(path)
+            wall = time.perf_counter() - start
+        report(results, "create_audio", summarize_samples(samples, wall, jobs, "chunks"))
+
+    print(f"\n🤖 Groq stand-in answered {stand_in.state.llm_calls} completion calls")
+    return results
+
+def compare(results: Dict[str, dict], baseline_path: str, tolerance: float, min_delta_ms: float) -> bool:
+    """Flag scenarios whose p95 latency grew by more than ``tolerance`` percent over the baseline.
+
+    Increases smaller than ``min_delta_ms`` are ignored so sub-millisecond
+    steps do not trip on timer noise.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)["results"]
+    print(f"\n📊 Comparing p95 latency against {baseline_path} (tolerance {tolerance:.0f}%)")
+    regressions = 0
+    for name, stats in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("p95_ms"):
+            continue
+        delta = stats["p95_ms"] - previous["p95_ms"]
+        change = delta / previous["p95_ms"] * 100
+        if change > tolerance and delta >= min_delta_ms:
+            regressions += 1
+            print(f"   ⚠️  {name}: {previous['p95_ms']:.1f} ms → {stats['p95_ms']:.1f} ms (+{change:.0f}%)")
+    if not regressions:
+        print("   No regressions")
+    return regressions == 0
+
+def main(args) -> bool:
+    args.workdir = tempfile.mkdtemp(prefix="eduai-bench-")
+    try:
+        page_counts = sorted({int(p) for p in args.pages.split(",")})
+        print(f"📝 Generating PDFs ({', '.join(map(str, page_counts))} pages, {args.cold_runs} variants each)...")
+        os.makedirs(os.path.join(args.workdir, "files"))
+        notes: Dict[str, dict] = {}
+        files: Dict[str, bytes] = {}
+        pdfs: Dict[int, List[str]] = {}
+        for pages in page_counts:
+            pdfs[pages] = []
+            for variant in range(args.cold_runs):
+                name = f"notes-{pages}p-{variant}.pdf"
+                path = os.path.join(args.workdir, "files", name)
+                create_benchmark_pdf(path, pages, seed=args.seed * 100003 + pages * 101 + variant)
+                with open(path, "rb") as f:
+                    files[name] = f.read()
+                pdfs[pages].append(name)
+
+        latency = StandInLatency(
+            groq=args.groq_latency / 1000, groq_token=args.groq_token_latency / 1000,
+            supabase=args.supabase_latency / 1000, storage=args.storage_latency / 1000, tts=args.tts_latency / 1000
+        )
+        stand_in = build_stand_in(latency, notes, files)
+        base_url = start_stand_in(stand_in)
+        for pages, names in pdfs.items():
+            for variant, name in enumerate(names):
+                notes[f"{pages}-{variant}"] = {
+                    "id": f"{pages}-{variant}", "title": name, "updated_at": "2024-01-01T00:00:00+00:00",
+                    "file_path": f"{base_url}/storage/v1/object/public/pdf-files/{name}",
+                }
+        print(f"🧪 Stand-in Groq/Supabase server at {base_url}")
+
+        # Point the app at the stand-ins and give it empty caches of its own
+        os.environ.update({
+            "VITE_SUPABASE_URL": base_url,
+            "VITE_SUPABASE_ANON_KEY": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark",
+            "GROQ_API_KEY": "gsk_benchmark",
+            "GROQ_BASE_URL": base_url,
+            "GROQ_REQUESTS_PER_MINUTE": str(args.groq_rpm),
+            "GROQ_TOKENS_PER_MINUTE": str(args.groq_tpm),
+            "GROQ_RATE_SHARE": "1",
+            "EMBEDDED_WORKERS": "0",
+            "NOTE_CACHE_DIR": os.path.join(args.workdir, "cache", "notes"),
+            "NOTE_INDEX_DIR": os.path.join(args.workdir, "cache", "indexes"),
+            "SUMMARY_CACHE_DB": os.path.join(args.workdir, "cache", "summaries.db"),
+            "CHAT_SESSION_DB": os.path.join(args.workdir, "cache", "chat_sessions.db"),
+            "ANSWER_CACHE_DB": os.path.join(args.workdir, "cache", "answers.db"),
+            "TTS_CACHE_DIR": os.path.join(args.workdir, "cache", "tts"),
+            "JOB_DB_PATH": os.path.join(args.workdir, "jobs.db"),
+            "METADATA_DB_PATH": os.path.join(args.workdir, "podcasts.db"),
+        })
+
+        started = time.time()
+        results = asyncio.run(run_pipeline_benchmarks(args, pdfs, stand_in))
+
+        output = {
+            "created_at": started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {
+                "pages": page_counts, "iterations": args.iterations, "requests": args.requests,
+                "concurrency": args.concurrency, "cold_runs": args.cold_runs, "audio_runs": args.audio_runs,
+                "script_lines": args.script_lines, "groq_latency_ms": args.groq_latency,
+                "groq_token_latency_ms": args.groq_token_latency, "groq_rpm": args.groq_rpm, "groq_tpm": args.groq_tpm, "supabase_latency_ms": args.supabase_latency,
+                "storage_latency_ms": args.storage_latency, "tts_latency_ms": args.tts_latency, "seed": args.seed,
+            },
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"\n💾 Results saved to {args.output} (peak RSS {output['peak_rss_mb']:.0f} MB)")
+
+        if args.baseline:
+            return compare(results, args.baseline, args.tolerance, args.min_delta_ms)
+        return True
+    finally:
+        shutil.rmtree(args.workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the note pipeline offline against stand-ins for Groq, Supabase and Edge TTS')
+    parser.add_argument('--pages', type=str, default='1,20,100', help='Comma-separated PDF page counts')
+    parser.add_argument('--iterations', type=int, default=5, help='Repetitions of each text-processing step')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per warm chat/summarize scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight at once')
+    parser.add_argument('--cold-runs', type=int, default=3, help='Distinct PDFs per page count for cold requests')
+    parser.add_argument('--audio-runs', type=int, default=2, help='Podcasts to synthesize')
+    parser.add_argument('--script-lines', type=int, default=40, help='Lines in each generated podcast script')
+    parser.add_argument('--groq-latency', type=float, default=300, help='Groq time to first token (ms)')
+    parser.add_argument('--groq-token-latency', type=float, default=5, help='Delay between streamed tokens (ms)')
+    parser.add_argument('--groq-rpm', type=float, default=0, help='Request limit for the LLM gateway (0 for none)')
+    parser.add_argument('--groq-tpm', type=float, default=0, help='Token limit for the LLM gateway (0 for none)')
+    parser.add_argument('--supabase-latency', type=float, default=20, help='Supabase query latency (ms)')
+    parser.add_argument('--storage-latency', type=float, default=50, help='Supabase Storage download latency (ms)')
+    parser.add_argument('--tts-latency', type=float, default=150, help='Edge TTS latency per chunk (ms)')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for generated PDFs and scripts')
+    parser.add_argument('--output', type=str, default='benchmark_results.json', help='Where to write the JSON results')
+    parser.add_argument('--baseline', type=str, help='Earlier results to compare against')
+    parser.add_argument('--min-delta-ms', type=float, default=5, help='Ignore p95 increases smaller than this (ms)')
+    parser.add_argument('--verbose', action='store_true', help='Keep the app\'s request logging')
+    parser.add_argument('--tolerance', type=float, default=20, help='Allowed p95 slowdown vs the baseline (percent)')
+
+    args = parser.parse_args()
+
+    print("🏁 Running offline pipeline benchmark...\n")
+
+    success = main(args)
+
+    if not success:
+        print("\n❌ Performance regressed beyond the tolerance. See the scenarios above.")
+        sys.exit(1)
+    else:
+        print("\n✅ Benchmark complete!")
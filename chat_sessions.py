@@ -0,0 +1,162 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+create table if not exists chat_sessions (
+    session_id text primary key,
+    note_id text not null,
+    digest text not null,
+    title text,
+    summary text not null default '',
+    summarized_through integer not null default 0,
+    created_at real not null,
+    updated_at real not null
+);
+create index if not exists chat_sessions_updated_idx on chat_sessions (updated_at);
+create table if not exists chat_turns (
+    session_id text not null,
+    seq integer not null,
+    role text not null,
+    content text not null,
+    tokens integer not null,
+    primary key (session_id, seq)
+);
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token for English)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+class ChatSessionStore(SQLiteStore):
+    """SQLite store of chat conversations about a note.
+
+    A session pins the note's content hash when the conversation starts, so
+    later turns reuse its cached pages and search index without going back
+    to Supabase. Turns are kept in order; older ones are folded into a
+    running ``summary`` by the caller, and ``summarized_through`` marks the
+    last turn the summary covers. Sessions idle for longer than
+    ``ttl_seconds`` expire.
+    """
+
+    schema = _SCHEMA
+
+    def __init__(self, db_path: str = "cache/chat_sessions.db", ttl_seconds: float = 24 * 3600):
+        self.ttl_seconds = ttl_seconds
+        super().__init__(db_path)
+
+    def create(self, note_id: str, digest: str, title: Optional[str] = None) -> str:
+        """Start a conversation about ``note_id`` and return its session id."""
+        session_id = uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "insert into chat_sessions (session_id, note_id, digest, title, created_at, updated_at)"
+                " values (?, ?, ?, ?, ?, ?)",
+                (session_id, note_id, digest, title, now, now),
+            )
+        self.purge_expired()
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Return the session row as a dict, or None if it is unknown or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "select note_id, digest, title, summary, summarized_through, updated_at"
+                " from chat_sessions where session_id = ?",
+                (session_id,),
+            ).fetchone()
+        if row is None or time.time() - row[5] > self.ttl_seconds:
+            return None
+        return {
+            "session_id": session_id,
+            "note_id": row[0],
+            "digest": row[1],
+            "title": row[2],
+            "summary": row[3],
+            "summarized_through": row[4],
+        }
+
+    def add_turns(self, session_id: str, turns: List[Tuple[str, str]]) -> None:
+        """Append ``(role, content)`` turns to the conversation."""
+        with self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                last = conn.execute(
+                    "select coalesce(max(seq), 0) from chat_turns where session_id = ?", (session_id,)
+                ).fetchone()[0]
+                conn.executemany(
+                    "insert into chat_turns (session_id, seq, role, content, tokens) values (?, ?, ?, ?, ?)",
+                    [(session_id, last + i + 1, role, content, estimate_tokens(content))
+                     for i, (role, content) in enumerate(turns)],
+                )
+                conn.execute("update chat_sessions set updated_at = ? where session_id = ?",
+                             (time.time(), session_id))
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+
+    def unsummarized(self, session_id: str) -> List[Dict]:
+        """Turns newer than the running summary, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "select t.seq, t.role, t.content, t.tokens from chat_turns t"
+                " join chat_sessions s on s.session_id = t.session_id"
+                " where t.session_id = ? and t.seq > s.summarized_through order by t.seq",
+                (session_id,),
+            ).fetchall()
+        return [{"seq": seq, "role": role, "content": content, "tokens": tokens}
+                for seq, role, content, tokens in rows]
+
+    def set_summary(self, session_id: str, summary: str, through_seq: int) -> None:
+        """Record a summary covering every turn up to ``through_seq``."""
+        with self._connect() as conn:
+            conn.execute(
+                "update chat_sessions set summary = ?, summarized_through = ?"
+                " where session_id = ? and summarized_through < ?",
+                (summary, through_seq, session_id, through_seq),
+            )
+
+    def delete(self, session_id: str) -> bool:
+        with self._connect() as conn:
+            conn.execute("delete from chat_turns where session_id = ?", (session_id,))
+            return conn.execute("delete from chat_sessions where session_id = ?", (session_id,)).rowcount > 0
+
+    def purge_expired(self) -> int:
+        """Delete sessions idle for longer than the TTL, with their turns."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "delete from chat_turns where session_id in"
+                " (select session_id from chat_sessions where updated_at < ?)",
+                (cutoff,),
+            )
+            removed = conn.execute("delete from chat_sessions where updated_at < ?", (cutoff,)).rowcount
+        if removed:
+            logger.info(f"Expired {removed} chat sessions")
+        return removed
+
+
+def history_window(turns: List[Dict], budget_tokens: int) -> Tuple[List[Dict], List[Dict]]:
+    """Split ``turns`` (oldest first) into ``(older, recent)``.
+
+    ``recent`` is the longest run of newest turns whose estimated tokens fit
+    in ``budget_tokens`` and that starts with a question rather than an
+    orphaned answer; everything before it is ``older``.
+    """
+    used = 0
+    start = len(turns)
+    while start > 0 and used + turns[start - 1]["tokens"] <= budget_tokens:
+        used += turns[start - 1]["tokens"]
+        start -= 1
+    while start < len(turns) and turns[start]["role"] != "user":
+        start += 1
+    return turns[:start], turns[start:]
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+
+_SCHEMA = """
+create table if not exists jobs (
+    id text primary key,
+    kind text not null,
+    payload text not null,
+    status text not null,
+    priority integer not null default 0,
+    attempts integer not null default 0,
+    max_attempts integer not null default 3,
+    message text,
+    progress real,
+    detail text,
+    result text,
+    error text,
+    locked_by text,
+    locked_until real,
+    available_at real not null,
+    created_at real not null,
+    updated_at real not null
+);
+create index if not exists jobs_claim_idx on jobs (status, priority desc, available_at, created_at);
+"""
+
+# Columns added after the first release: (name, definition)
+_ADDED_COLUMNS = [("detail", "text")]
+
+# Columns stored as JSON
+_JSON_FIELDS = ("result", "detail")
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker claimed it (or it was failed)."""
+
+
+class JobStore(SQLiteStore):
+    """SQLite-backed durable job queue shared by the web and worker processes.
+
+    Workers ``claim`` the highest-priority runnable job under a lease and
+    keep it with ``renew``; a job whose worker dies is picked up again once
+    its lease expires, unless it has used up ``max_attempts``. Writes that
+    pass ``owner`` only apply while that worker still holds the lease.
+    Failed attempts are re-queued with exponential backoff until
+    ``max_attempts``.
+    """
+
+    schema = _SCHEMA
+    row_factory = sqlite3.Row
+
+    def __init__(self, db_path: str = "cache/jobs.db", lease_seconds: float = 600, retry_backoff: float = 5):
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+        super().__init__(db_path)
+        with self._connect() as conn:
+            existing = {row["name"] for row in conn.execute("pragma table_info(jobs)")}
+            for name, definition in _ADDED_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"alter table jobs add column {name} {definition}")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+        for name in _JSON_FIELDS:
+            job[name] = json.loads(job[name]) if job[name] else None
+        return job
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None,
+                priority: int = 0, max_attempts: int = 3, message: str = "Queued") -> str:
+        """Add a job and return its id. Higher ``priority`` runs first."""
+        job_id = job_id or str(uuid4())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "insert into jobs (id, kind, payload, status, priority, max_attempts, message, progress,"
+                " available_at, created_at, updated_at) values (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, priority, max_attempts, message, now, now, now),
+            )
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the next runnable job, or return None if there is none."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                # A job that keeps killing its worker is left for fail_expired, not reclaimed forever
+                row = conn.execute(
+                    "select id from jobs where (status = ? and available_at <= ?)"
+                    " or (status = ? and locked_until < ? and attempts < max_attempts)"
+                    " order by priority desc, available_at, created_at limit 1",
+                    (QUEUED, now, PROCESSING, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("commit")
+                    return None
+                conn.execute(
+                    "update jobs set status = ?, attempts = attempts + 1, locked_by = ?, locked_until = ?,"
+                    " updated_at = ? where id = ?",
+                    (PROCESSING, worker_id, now + self.lease_seconds, now, row["id"]),
+                )
+                job = conn.execute("select * from jobs where id = ?", (row["id"],)).fetchone()
+                conn.execute("commit")
+            except Exception:
+                conn.execute("rollback")
+                raise
+        return self._to_dict(job)
+
+    def fail_expired(self) -> List[Dict[str, Any]]:
+        """Fail jobs whose worker stopped responding on their last attempt, and return them."""
+        now = time.time()
+        error = "Worker stopped responding"
+        with self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                ids = [row["id"] for row in conn.execute(
+                    "select id from jobs where status = ? and locked_until < ? and attempts >= max_attempts",
+                    (PROCESSING, now),
+                )]
+                jobs = []
+                for job_id in ids:
+                    conn.execute(
+                        "update jobs set status = ?, error = ?, message = ?, progress = 0, locked_by = null,"
+                        " locked_until = null, updated_at = ? where id = ?",
+                        (FAILED, error, f"Error: {error}", now, job_id),
+                    )
+                    jobs.append(self._to_dict(conn.execute("select * from jobs where id = ?", (job_id,)).fetchone()))
+                conn.execute("commit")
+            except Exception:
+                conn.execute("rollback")
+                raise
+        return jobs
+
+    def update(self, job_id: str, owner: Optional[str] = None, **fields: Any) -> None:
+        """Update progress fields (``message``, ``progress``, ``detail``...) and renew the lease.
+
+        With ``owner``, raises ``LeaseLost`` unless that worker still holds the job.
+        """
+        now = time.time()
+        fields = {k: json.dumps(v) if k in _JSON_FIELDS else v for k, v in fields.items()}
+        fields["updated_at"] = now
+        if "locked_until" not in fields:
+            fields["locked_until"] = now + self.lease_seconds
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        where, params = "id = ?", [job_id]
+        if owner is not None:
+            where, params = "id = ? and locked_by = ?", [job_id, owner]
+        with self._connect() as conn:
+            updated = conn.execute(f"update jobs set {assignments} where {where}", (*fields.values(), *params)).rowcount
+        if owner is not None and not updated:
+            raise LeaseLost(job_id)
+
+    def renew(self, job_id: str, owner: str) -> bool:
+        """Extend ``owner``'s lease on a running job. Returns False if the lease was lost."""
+        with self._connect() as conn:
+            return conn.execute(
+                "update jobs set locked_until = ? where id = ? and status = ? and locked_by = ?",
+                (time.time() + self.lease_seconds, job_id, PROCESSING, owner),
+            ).rowcount > 0
+
+    def complete(self, job_id: str, result: Optional[Dict[str, Any]] = None,
+                 message: str = "Completed", owner: Optional[str] = None) -> None:
+        self.update(job_id, owner, status=COMPLETED, progress=1.0, message=message, result=result,
+                    error=None, locked_by=None, locked_until=None)
+
+    def fail(self, job_id: str, error: str, owner: Optional[str] = None) -> bool:
+        """Record a failed attempt. Returns True if the job was re-queued for another try."""
+        job = self.get(job_id)
+        if job is None:
+            return False
+        if owner is not None and job["locked_by"] != owner:
+            raise LeaseLost(job_id)
+        if job["attempts"] < job["max_attempts"]:
+            delay = self.retry_backoff * (2 ** (job["attempts"] - 1))
+            self.update(job_id, owner, status=QUEUED, error=error, message=f"Retrying after error: {error}",
+                        available_at=time.time() + delay, locked_by=None, locked_until=None)
+            return True
+        self.update(job_id, owner, status=FAILED, error=error, message=f"Error: {error}", progress=0,
+                    locked_by=None, locked_until=None)
+        return False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("select * from jobs where id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+
+async def _keep_lease(store: JobStore, job: Dict[str, Any], work: asyncio.Task) -> None:
+    """Renew a job's lease while it runs; stop the work if another worker has taken it over."""
+    while True:
+        await asyncio.sleep(store.lease_seconds / 3)
+        try:
+            renewed = await asyncio.to_thread(store.renew, job["id"], job["locked_by"])
+        except sqlite3.Error as e:
+            logger.error(f"Could not renew lease on job {job['id']}: {e}")
+            continue
+        if not renewed:
+            logger.warning(f"Lost the lease on job {job['id']}; stopping it")
+            work.cancel()
+            return
+
+
+async def run_worker(store: JobStore, handler: Callable[[Dict[str, Any]], Awaitable[None]],
+                     concurrency: int = 1, poll_interval: float = 1.0,
+                     worker_id: Optional[str] = None,
+                     on_expired: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> None:
+    """Claim and run jobs forever with up to ``concurrency`` jobs in flight.
+
+    ``handler`` receives the claimed job and is responsible for recording
+    its outcome with ``complete`` or ``fail``, passing ``job["locked_by"]``
+    as the owner. The lease is renewed in the background while it runs.
+    Errors escaping ``handler`` are logged and the slot carries on.
+    ``on_expired`` receives each job failed because its worker stopped
+    responding on the last attempt.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker {worker_id} started with concurrency {concurrency}")
+
+    async def slot(slot_idx: int) -> None:
+        while True:
+            try:
+                for expired in await asyncio.to_thread(store.fail_expired):
+                    logger.error(f"Job {expired['id']} failed: its worker stopped responding on the last attempt")
+                    if on_expired:
+                        await on_expired(expired)
+                job = await asyncio.to_thread(store.claim, f"{worker_id}/{slot_idx}")
+            except Exception as e:
+                logger.error(f"Could not claim or expire jobs: {e}", exc_info=True)
+                job = None
+            if job is None:
+                await asyncio.sleep(poll_interval)
+                continue
+            logger.info(f"Worker {worker_id}/{slot_idx} running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+            work = asyncio.create_task(handler(job))
+            heartbeat = asyncio.create_task(_keep_lease(store, job, work))
+            try:
+                await asyncio.wait([work])
+            finally:
+                heartbeat.cancel()
+                work.cancel()  # no-op once finished; stops the job if this worker is shutting down
+            if work.cancelled():
+                continue
+            error = work.exception()
+            if isinstance(error, LeaseLost):
+                logger.warning(f"Job {job['id']} was taken over by another worker; its result was discarded")
+            elif error is not None:
+                # The lease runs out and the job is retried; this slot keeps serving the queue
+                logger.error(f"Unhandled error in {job['kind']} job {job['id']}: {error!r}",
+                             exc_info=(type(error), error, error.__traceback__))
+
+    await asyncio.gather(*[slot(i) for i in range(max(concurrency, 1))])
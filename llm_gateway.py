@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import random
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import groq
+
+from metrics import LLM_CALLS, LLM_COALESCED, LLM_FALLBACKS, LLM_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes; when capacity is short, lower lanes are admitted first
+INTERACTIVE = 0  # someone is waiting on this answer (chat, single summaries)
+BULK = 1  # requested by a user, but many at once (batch summaries)
+BACKGROUND = 2  # nobody is waiting (podcast scripts, history compaction, stale refreshes)
+_LANE_NAMES = {INTERACTIVE: "interactive", BULK: "bulk", BACKGROUND: "background"}
+
+# Failures worth retrying: rate limiting, 5xx responses, timeouts and connection errors
+_RETRYABLE = (groq.RateLimitError, groq.InternalServerError, groq.APIConnectionError)
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute`` up to one minute's worth; 0 disables the limit."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` (capped at the burst size) is available."""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.rate:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """Return over-reserved units (or charge more when ``amount`` is negative)."""
+        if self.rate:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class ModelLimiter:
+    """Admits calls to one model in lane order as its request and token budgets allow."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._queue: List[list] = []  # heap of [lane, seq, cost]
+        self._seq = itertools.count()
+        self._changed = asyncio.Condition()
+        self._paused_until = 0.0
+
+    def _wait_time(self, cost: int) -> float:
+        return max(self._paused_until - time.monotonic(), self.requests.wait_time(1), self.tokens.wait_time(cost), 0.0)
+
+    def estimated_wait(self, cost: int) -> float:
+        """Rough delay before a new call costing ``cost`` tokens would be admitted."""
+        queued = sum(entry[2] for entry in self._queue)
+        return max(self._paused_until - time.monotonic(), self.requests.wait_time(len(self._queue) + 1),
+                   self.tokens.wait_time(queued + cost), 0.0)
+
+    def pause(self, seconds: float) -> None:
+        """Admit nothing for ``seconds`` (after Groq answered 429)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, cost: int, lane: int) -> None:
+        entry = [lane, next(self._seq), cost]
+        heapq.heappush(self._queue, entry)
+        try:
+            async with self._changed:
+                while True:
+                    timeout = None
+                    if self._queue[0] is entry:
+                        timeout = self._wait_time(cost)
+                        if timeout <= 0:
+                            heapq.heappop(self._queue)
+                            self.requests.take(1)
+                            self.tokens.take(cost)
+                            self._changed.notify_all()
+                            return
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+        except BaseException:
+            # Cancelled while queued; let whoever is next re-check
+            if any(queued is entry for queued in self._queue):
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                async with self._changed:
+                    self._changed.notify_all()
+            raise
+
+
+class LLMGateway:
+    """Single path to Groq for every chat completion the app makes.
+
+    Calls are admitted per model by token buckets sized to Groq's request
+    and token per-minute limits, in priority lanes so interactive work
+    jumps ahead of background jobs. Rate limiting, 5xx responses and
+    connection failures are retried with jittered backoff; a 429 also
+    pauses the model for its ``retry-after``. When the primary model's
+    queue would delay a call by more than ``fallback_after`` seconds,
+    the call goes to ``fallback_model`` instead. Identical non-streaming
+    calls already in flight are shared rather than repeated.
+    """
+
+    def __init__(self, client: groq.AsyncGroq, model: str, fallback_model: Optional[str] = None,
+                 requests_per_minute: float = 30, tokens_per_minute: float = 0, retries: int = 3,
+                 backoff: float = 1.0, fallback_after: float = 2.0, completion_tokens: int = 512):
+        # Retries happen here, where they can see the rate limits, not inside the SDK
+        self.client = client.with_options(max_retries=0)
+        self.model = model
+        self.fallback_model = fallback_model if fallback_model != model else None
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.retries = retries
+        self.backoff = backoff
+        self.fallback_after = fallback_after
+        self.completion_tokens = completion_tokens
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._inflight: Dict[str, list] = {}  # key -> [task, callers waiting on it]
+
+    def _limiter(self, model: str) -> ModelLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limiter = self._limiters[model] = ModelLimiter(self.requests_per_minute, self.tokens_per_minute)
+        return limiter
+
+    def _cost(self, params: dict) -> int:
+        # About four characters per token, plus the completion we may be charged for
+        prompt_chars = sum(len(m.get("content") or "") for m in params.get("messages", []))
+        return (prompt_chars + 3) // 4 + (params.get("max_tokens") or self.completion_tokens)
+
+    def _pick_model(self, model: str, cost: int) -> str:
+        if model != self.model or not self.fallback_model:
+            return model
+        wait = self._limiter(model).estimated_wait(cost)
+        if wait > self.fallback_after and self._limiter(self.fallback_model).estimated_wait(cost) < wait:
+            return self.fallback_model
+        return model
+
+    async def _call(self, lane: int, params: dict, stream: bool):
+        requested = params.pop("model", None) or self.model
+        cost = self._cost(params)
+        for attempt in range(self.retries + 1):
+            model = self._pick_model(requested, cost)
+            if model != requested:
+                LLM_FALLBACKS.labels(model).inc()
+            limiter = self._limiter(model)
+            start = time.perf_counter()
+            await limiter.acquire(cost, lane)
+            LLM_WAIT_SECONDS.labels(_LANE_NAMES.get(lane, str(lane))).observe(time.perf_counter() - start)
+            try:
+                response = await self.client.chat.completions.create(model=model, stream=stream, **params)
+            except _RETRYABLE as e:
+                rate_limited = isinstance(e, groq.RateLimitError)
+                LLM_CALLS.labels(model, "rate_limited" if rate_limited else "error").inc()
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                if rate_limited:
+                    # The model stays paused for everyone; this call may move to the fallback
+                    limiter.pause(_retry_after(e) or delay)
+                    logger.warning(f"Groq rate limited {model}; retrying (attempt {attempt + 1})")
+                else:
+                    logger.warning(f"Groq call to {model} failed ({e!r}); retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                continue
+            except Exception:
+                LLM_CALLS.labels(model, "failed").inc()
+                raise
+            LLM_CALLS.labels(model, "ok").inc()
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                limiter.tokens.refund(cost - usage.total_tokens)
+            return response
+
+    def served_model(self, response) -> str:
+        """The model that produced ``response`` (a completion or stream chunk), which may be the fallback."""
+        return getattr(response, "model", None) or self.model
+
+    async def create(self, *, priority: int = INTERACTIVE, **params):
+        """Non-streaming chat completion; takes the same arguments as ``chat.completions.create``."""
+        key = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        shared = self._inflight.get(key)
+        if shared is None:
+            task = asyncio.ensure_future(self._call(priority, dict(params), stream=False))
+            shared = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            LLM_COALESCED.inc()
+        task = shared[0]
+        shared[1] += 1
+        try:
+            # Shielded so one caller giving up doesn't cancel the call for the others
+            return await asyncio.shield(task)
+        finally:
+            shared[1] -= 1
+            if not shared[1] and not task.done():
+                task.cancel()
+
+    def _finished(self, key: str, task: asyncio.Future) -> None:
+        shared = self._inflight.get(key)
+        if shared is not None and shared[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so abandoned failures aren't reported as unhandled
+
+    async def stream(self, *, priority: int = INTERACTIVE, **params):
+        """Open a streaming chat completion. Retries and fallback apply until the stream opens."""
+        return await self._call(priority, dict(params), stream=True)
+
+    def blocking(self, loop: asyncio.AbstractEventLoop, priority: int = BACKGROUND):
+        """A ``Groq``-client-shaped object for code running in worker threads; calls run on ``loop``."""
+        def create(**params):
+            return asyncio.run_coroutine_threadsafe(self.create(priority=priority, **params), loop).result()
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def _retry_after(error: groq.APIStatusError) -> Optional[float]:
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
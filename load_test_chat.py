@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from uuid import uuid4
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+async def timed_chat(client: httpx.AsyncClient, endpoint: str, note_id: str, question: str):
+    """Send one chat request and return (status_code, seconds)."""
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json={"note_id": note_id, "question": question, "history": []})
+        status = response.status_code
+    except httpx.HTTPError as e:
+        print(f"   Request failed: {e}")
+        status = None
+    return status, time.perf_counter() - start
+
+async def run_load_test(note_id: str, concurrency: int, question: str) -> bool:
+    """Fire ``concurrency`` chat requests at once and check they overlap.
+
+    If the server handled them one at a time, the wall-clock time would be
+    close to the sum of the individual latencies. With non-blocking handlers
+    it should be close to the slowest single request. Each timed request
+    asks a different variant of ``question`` so none of them is answered
+    from the server's answer cache.
+    """
+    api_url = os.getenv('VITE_API_URL', 'http://localhost:8006')
+    chat_endpoint = f"{api_url.rstrip('/')}/api/chat"
+    print(f"📤 Sending {concurrency} concurrent requests to: {chat_endpoint}")
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        # Warm up so the note is downloaded, parsed and cached before timing
+        status, warmup = await timed_chat(client, chat_endpoint, note_id, question)
+        print(f"   Warm-up request: status={status}, {warmup:.2f}s")
+        if status != 200:
+            print("❌ Warm-up request failed; is the server running and the note ID valid?")
+            return False
+
+        # Tagged per run as well, since the answer cache outlives this script
+        run_id = uuid4().hex[:8]
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            timed_chat(client, chat_endpoint, note_id, f"{question} (load test {run_id}, request {i + 1})")
+            for i in range(concurrency)
+        ])
+        wall = time.perf_counter() - start
+
+    latencies = sorted(seconds for _, seconds in results)
+    ok = sum(1 for status, _ in results if status == 200)
+    serial_estimate = sum(latencies)
+    overlap = serial_estimate / wall if wall else 0.0
+
+    print(f"\n📥 {ok}/{concurrency} requests succeeded")
+    print(f"   Wall time:            {wall:.2f}s")
+    print(f"   Sum of latencies:     {serial_estimate:.2f}s")
+    print(f"   Slowest request:      {latencies[-1]:.2f}s")
+    print(f"   Median request:       {latencies[len(latencies) // 2]:.2f}s")
+    print(f"   Concurrency achieved: {overlap:.1f}x (1.0x means requests were serialized)")
+
+    # Allow some slack for scheduling and upstream rate limits
+    return ok == concurrency and overlap >= concurrency * 0.5
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load test the chat API with concurrent requests')
+    parser.add_argument('--note-id', type=str, required=True, help='Note ID to use for the chat')
+    parser.add_argument('--concurrency', type=int, default=10, help='Number of simultaneous requests')
+    parser.add_argument('--question', type=str, default="What is this document about?",
+                        help='Question to ask about the document')
+
+    args = parser.parse_args()
+
+    print("🔍 Load testing Chat API...\n")
+
+    success = asyncio.run(run_load_test(args.note_id, args.concurrency, args.question))
+
+    if not success:
+        print("\n❌ Requests did not run concurrently (or failed). See the numbers above.")
+        sys.exit(1)
+    else:
+        print("\n✅ Concurrent chat requests were handled in parallel!")
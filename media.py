@@ -0,0 +1,125 @@
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+# Files are streamed in blocks of this size
+MEDIA_CHUNK_SIZE = 256 * 1024
+
+# Completed episodes never change, so clients and CDNs may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def file_etag(st: os.stat_result) -> str:
+    """Strong validator derived from the file's size and modification time."""
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive ``(start, end)``.
+
+    Returns None for headers that should be ignored (malformed or multiple
+    ranges, which are answered with the full file). Raises 416 when the
+    range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in tags or "*" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _range_applies(request: Request, etag: str, last_modified: str) -> bool:
+    # If-Range: only honour the range if the client's copy is still current
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, last_modified)
+
+
+def _read_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(MEDIA_CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def serve_media(request: Request, path: str, media_type: str = "audio/mpeg",
+                immutable: bool = False, filename: Optional[str] = None) -> Response:
+    """Serve a file with conditional GET (ETag/Last-Modified, 304) and byte ranges (206).
+
+    ``immutable`` files get a year-long Cache-Control; others must be
+    revalidated, which is cheap thanks to the validators.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Audio file not found")
+
+    etag = file_etag(st)
+    last_modified = formatdate(st.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    if _not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    size = st.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except HTTPException as e:
+            e.headers = {**headers, **e.headers}
+            raise
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        body = iter(()) if request.method == "HEAD" else _read_file(path, 0, size)
+        return StreamingResponse(body, status_code=200, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    body = iter(()) if request.method == "HEAD" else _read_file(path, start, length)
+    return StreamingResponse(body, status_code=206, media_type=media_type, headers=headers)
@@ -0,0 +1,117 @@
+import json
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlite_store import SQLiteStore
+
+_SCHEMA = """
+create table if not exists podcasts (
+    task_id text primary key,
+    user_id text,
+    note_id text,
+    status text,
+    output_path text,
+    data text not null,
+    created_at real not null,
+    updated_at real not null
+);
+create index if not exists podcasts_user_idx on podcasts (user_id, created_at desc);
+create index if not exists podcasts_note_idx on podcasts (note_id, created_at desc);
+create index if not exists podcasts_status_idx on podcasts (status, updated_at);
+"""
+
+# Metadata keys copied into indexed columns
+_INDEXED = ("user_id", "note_id", "status", "output_path")
+
+
+class PodcastMetadataStore(SQLiteStore):
+    """Podcast metadata in one SQLite (WAL) database instead of a JSON file per task.
+
+    The full metadata dict is kept as JSON; ``user_id``, ``note_id``,
+    ``status`` and ``output_path`` are also stored in indexed columns so
+    podcasts can be listed and expired without scanning every record.
+    """
+
+    schema = _SCHEMA
+    row_factory = sqlite3.Row
+
+    def __init__(self, db_path: str = "metadata/podcasts.db"):
+        super().__init__(db_path)
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        metadata = json.loads(row["data"])
+        metadata.setdefault("task_id", row["task_id"])
+        metadata.setdefault("created_at", row["created_at"])
+        metadata.setdefault("updated_at", row["updated_at"])
+        return metadata
+
+    def save(self, task_id: str, metadata: Dict[str, Any], merge: bool = True,
+             created_at: Optional[float] = None) -> None:
+        """Insert or update a task's metadata in one transaction.
+
+        With ``merge`` the new keys are layered over any existing record.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                row = conn.execute("select data from podcasts where task_id = ?", (task_id,)).fetchone()
+                data = {**json.loads(row["data"]), **metadata} if row and merge else dict(metadata)
+                conn.execute(
+                    "insert into podcasts (task_id, user_id, note_id, status, output_path, data, created_at, updated_at)"
+                    " values (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " on conflict (task_id) do update set user_id = excluded.user_id, note_id = excluded.note_id,"
+                    " status = excluded.status, output_path = excluded.output_path, data = excluded.data,"
+                    " updated_at = excluded.updated_at",
+                    (task_id, *(data.get(key) for key in _INDEXED), json.dumps(data), created_at or now, now),
+                )
+                conn.execute("commit")
+            except Exception:
+                conn.execute("rollback")
+                raise
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("select * from podcasts where task_id = ?", (task_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def query(self, user_id: Optional[str] = None, note_id: Optional[str] = None,
+              status: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Newest-first podcasts matching every filter that is given."""
+        clauses, params = [], []
+        for column, value in (("user_id", user_id), ("note_id", note_id), ("status", status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"where {' and '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"select * from podcasts {where} order by created_at desc limit ? offset ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def delete(self, task_id: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("delete from podcasts where task_id = ?", (task_id,)).rowcount > 0
+
+    def expire(self, older_than_seconds: float, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Delete records not updated for ``older_than_seconds`` and return them
+        (so the caller can remove their audio files)."""
+        cutoff = time.time() - older_than_seconds
+        clause, params = "updated_at < ?", [cutoff]
+        if status is not None:
+            clause += " and status = ?"
+            params.append(status)
+        with self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                rows = conn.execute(f"select * from podcasts where {clause}", params).fetchall()
+                conn.execute(f"delete from podcasts where {clause}", params)
+                conn.execute("commit")
+            except Exception:
+                conn.execute("rollback")
+                raise
+        return [self._to_dict(row) for row in rows]
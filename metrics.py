@@ -0,0 +1,77 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# Buckets spanning cache hits (ms) to long LLM and TTS calls (minutes)
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+REQUEST_SECONDS = Histogram(
+    "eduai_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=_LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "eduai_stage_seconds", "Time spent in one stage of a pipeline", ["pipeline", "stage"], buckets=_LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter("eduai_stage_errors_total", "Pipeline stages that raised", ["pipeline", "stage"])
+TTS_CHUNK_SECONDS = Histogram(
+    "eduai_tts_chunk_seconds", "Time to obtain audio for one script chunk", ["source"], buckets=_LATENCY_BUCKETS
+)
+LLM_CALLS = Counter("eduai_llm_calls_total", "Groq calls by model and outcome", ["model", "outcome"])
+LLM_WAIT_SECONDS = Histogram(
+    "eduai_llm_wait_seconds", "Time a Groq call waited for rate-limit capacity", ["lane"], buckets=_LATENCY_BUCKETS
+)
+LLM_COALESCED = Counter("eduai_llm_coalesced_total", "Groq calls answered by an identical call already in flight")
+LLM_FALLBACKS = Counter("eduai_llm_fallbacks_total", "Groq calls sent to the fallback model", ["model"])
+
+# Stages timed during the current request, for the Server-Timing header
+_request_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_spans", default=None
+)
+
+
+@contextmanager
+def stage(pipeline: str, name: str):
+    """Time a block as ``name`` within ``pipeline`` (works around ``await`` too)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(pipeline, name).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(pipeline, name).observe(elapsed)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((f"{pipeline}.{name}", elapsed))
+
+
+def start_request_spans() -> contextvars.Token:
+    """Begin collecting stage timings for the current request."""
+    return _request_spans.set([])
+
+
+def finish_request_spans(token: contextvars.Token) -> List[Tuple[str, float]]:
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
+
+
+def server_timing_header(spans: List[Tuple[str, float]], total: float) -> str:
+    """Format spans as a ``Server-Timing`` header (durations in milliseconds).
+
+    Stages that ran more than once (e.g. retries) are summed.
+    """
+    totals = {}
+    for name, elapsed in spans:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    entries = [f"{name.replace(' ', '_')};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
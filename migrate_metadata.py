@@ -0,0 +1,69 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from metadata_store import PodcastMetadataStore
+from utils import METADATA_DB_PATH
+
+def migrate(metadata_dir: str, db_path: str, delete_json: bool, overwrite: bool) -> bool:
+    """Import every ``<task_id>.json`` in ``metadata_dir`` into the metadata database.
+
+    Records already in the database are left alone unless ``overwrite`` is
+    set, so the tool can be re-run safely. The file's mtime becomes the
+    record's creation time.
+    """
+    store = PodcastMetadataStore(db_path)
+    paths = sorted(glob.glob(os.path.join(metadata_dir, "*.json")))
+    print(f"📂 Found {len(paths)} metadata files in {metadata_dir}")
+
+    imported = skipped = failed = 0
+    for path in paths:
+        task_id = os.path.splitext(os.path.basename(path))[0]
+        try:
+            with open(path, "r") as f:
+                metadata = json.load(f)
+            if not isinstance(metadata, dict):
+                raise ValueError("not a JSON object")
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️  {task_id}: could not read ({e})")
+            failed += 1
+            continue
+
+        if store.get(task_id) is not None and not overwrite:
+            skipped += 1
+        else:
+            store.save(task_id, metadata, merge=False, created_at=os.path.getmtime(path))
+            imported += 1
+
+        if delete_json:
+            os.remove(path)
+
+    print(f"\n📥 Imported {imported}, skipped {skipped} already present, {failed} unreadable")
+    print(f"   Database: {db_path}")
+    return failed == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import metadata/<task_id>.json files into the podcast metadata database')
+    parser.add_argument('--metadata-dir', type=str, default='metadata', help='Directory holding the JSON files')
+    parser.add_argument('--db', type=str, default=METADATA_DB_PATH, help='Metadata database to import into')
+    parser.add_argument('--delete-json', action='store_true', help='Remove each JSON file once it is in the database')
+    parser.add_argument('--overwrite', action='store_true', help='Replace records that are already in the database')
+
+    args = parser.parse_args()
+
+    print("🔄 Migrating podcast metadata...\n")
+
+    success = migrate(args.metadata_dir, args.db, args.delete_json, args.overwrite)
+
+    if not success:
+        print("\n❌ Some metadata files could not be imported. See the messages above.")
+        sys.exit(1)
+    else:
+        print("\n✅ Metadata migration complete!")
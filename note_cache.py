@@ -0,0 +1,240 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    """Return the SHA-256 hex digest used to address cached note text."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def join_pages(pages: List[str]) -> str:
+    """Join cleaned page texts into the single string the prompts use."""
+    return " ".join(page for page in pages if page)
+
+
+class NoteTextCache:
+    """Two-tier (memory + disk) cache for text extracted from note PDFs.
+
+    Values are the cleaned text of each page, kept separate so page numbers
+    survive for retrieval. Text is content-addressed by the hash of the PDF bytes, so two notes that
+    point at the same file share one entry. Each note id is bound to the
+    version (e.g. ``notes.updated_at``) and content hash it was last seen
+    with; a different version invalidates the binding so the file is fetched
+    again. The binding also keeps the file's URL and ETag so that fetch can
+    be a conditional GET.
+    """
+
+    def __init__(self, cache_dir: str = "cache/notes", max_memory_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "content_hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_mtime = None
+        self._index: Dict[str, Dict[str, str]] = self._load_index()
+
+    # -- index -------------------------------------------------------------
+
+    def _load_index(self) -> Dict[str, Dict[str, str]]:
+        try:
+            self._index_mtime = os.stat(self._index_path).st_mtime_ns
+            with open(self._index_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable note cache index: {e}")
+            return {}
+
+    def _save_index(self) -> None:
+        # Callers refresh first and then mutate, so bindings written by other processes survive
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+        self._index_mtime = os.stat(self._index_path).st_mtime_ns
+
+    def _refresh_index(self) -> None:
+        """Reload the index if another process (e.g. an ingestion worker) has rewritten it."""
+        try:
+            mtime = os.stat(self._index_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._index_mtime:
+            self._index = self._load_index()
+
+    # -- tiers -------------------------------------------------------------
+
+    def _entry_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _remember(self, digest: str, pages: List[str]) -> None:
+        """Insert into the memory tier, evicting least recently used entries."""
+        size = sum(len(page) for page in pages)
+        if size > self.max_memory_bytes:
+            return
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        self._memory[digest] = pages
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sum(len(page) for page in evicted)
+            self._stats["memory_evictions"] += 1
+
+    def _read(self, digest: str) -> Tuple[Optional[List[str]], Optional[str]]:
+        """Return ``(pages, tier)`` where tier is ``"memory"`` or ``"disk"``."""
+        pages = self._memory.get(digest)
+        if pages is not None:
+            self._memory.move_to_end(digest)
+            return pages, "memory"
+        path = self._entry_path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                pages = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        os.utime(path)  # mtime doubles as the disk tier's LRU clock
+        self._remember(digest, pages)
+        return pages, "disk"
+
+    def _write(self, digest: str, pages: List[str]) -> None:
+        path = self._entry_path(digest)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pages, f)
+        os.replace(tmp_path, path)
+        self._remember(digest, pages)
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json") or name == "index.json":
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path, name[:-5]))
+            total += st.st_size
+        if total <= self.max_disk_bytes:
+            return
+        entries.sort()
+        evicted = set()
+        for _, size, path, digest in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted.add(digest)
+            self._stats["disk_evictions"] += 1
+        if evicted:
+            self._refresh_index()
+            self._index = {k: v for k, v in self._index.items() if v.get("hash") not in evicted}
+            self._save_index()
+
+    # -- public API --------------------------------------------------------
+
+    def get(self, note_id: str, version: Optional[str]) -> Optional[Tuple[str, List[str]]]:
+        """Return ``(content_hash, pages)`` for a note if it is bound to ``version``."""
+        with self._lock:
+            entry = self._index.get(note_id)
+            if entry is None or entry.get("version") != version:
+                self._refresh_index()
+                entry = self._index.get(note_id)
+            if entry is None or version is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.get("version") != version:
+                # Kept (but no longer served) so validator() can still offer its ETag
+                self._stats["invalidations"] += 1
+                self._stats["misses"] += 1
+                return None
+            pages, tier = self._read(entry["hash"])
+            self._stats[f"{tier}_hits" if tier else "misses"] += 1
+            return (entry["hash"], pages) if pages is not None else None
+
+    def validator(self, note_id: str, url: str) -> Optional[Tuple[str, str]]:
+        """Return ``(content_hash, etag)`` last seen for the note's file at ``url``, if any."""
+        with self._lock:
+            entry = self._index.get(note_id)
+            if entry is None or entry.get("url") != url or not entry.get("etag"):
+                return None
+            return entry["hash"], entry["etag"]
+
+    def _bind(self, note_id: str, version: Optional[str], digest: str,
+              url: Optional[str], etag: Optional[str]) -> None:
+        if version is None:
+            return
+        entry = {"version": version, "hash": digest}
+        if url and etag:
+            entry.update(url=url, etag=etag)
+        self._refresh_index()
+        self._index[note_id] = entry
+        self._save_index()
+
+    def get_by_content(self, note_id: str, version: Optional[str], digest: str,
+                       url: Optional[str] = None, etag: Optional[str] = None) -> Optional[List[str]]:
+        """Return cached pages for downloaded PDF bytes and rebind the note to them."""
+        with self._lock:
+            pages, _ = self._read(digest)
+            if pages is None:
+                return None
+            self._stats["content_hits"] += 1
+            self._bind(note_id, version, digest, url, etag)
+            return pages
+
+    def put(self, note_id: str, version: Optional[str], digest: str, pages: List[str],
+            url: Optional[str] = None, etag: Optional[str] = None) -> None:
+        """Store the extracted pages of a note version."""
+        with self._lock:
+            self._write(digest, pages)
+            self._bind(note_id, version, digest, url, etag)
+
+    def invalidate(self, note_id: str) -> None:
+        """Forget which file a note points at, forcing the next read to re-fetch it."""
+        with self._lock:
+            self._refresh_index()
+            if self._index.pop(note_id, None) is not None:
+                self._save_index()
+                self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            return {
+                **self._stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "notes_indexed": len(self._index),
+            }
@@ -1,6 +1,9 @@
-from typing import Dict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from pydub import AudioSegment
+import io
 import os
+import random
 import unicodedata
 import re
 import time
@@ -9,6 +12,50 @@ import asyncio
 import edge_tts
 import shutil
 import gtts
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import TTS_CHUNK_SECONDS, stage
+from retrieval import NoteIndex
+from tts_cache import TTSCache
+
+# TTS scheduling: how many chunks synthesize at once, the minimum spacing
+# between requests to the same voice, and retries per voice before falling back
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", 4))
+TTS_VOICE_INTERVAL = float(os.getenv("TTS_VOICE_INTERVAL", 0.1))
+TTS_RETRIES = int(os.getenv("TTS_RETRIES", 1))
+TTS_RETRY_BACKOFF = float(os.getenv("TTS_RETRY_BACKOFF", 0.5))
+
+# Script generation: outline sections scripted at once, the cap on sections,
+# and how many source passages back each section's prompt
+SCRIPT_CONCURRENCY = int(os.getenv("SCRIPT_CONCURRENCY", 4))
+SCRIPT_MAX_SECTIONS = int(os.getenv("SCRIPT_MAX_SECTIONS", 8))
+SCRIPT_EXCERPTS_PER_SECTION = int(os.getenv("SCRIPT_EXCERPTS_PER_SECTION", 4))
+
+# Host/guest voices and the Edge TTS voice to try if the primary one fails
+HOST_VOICE = "en-US-GuyNeural"
+GUEST_VOICE = "en-GB-LibbyNeural"
+FALLBACK_VOICES = {"en-US-GuyNeural": "en-US-AriaNeural", "en-GB-LibbyNeural": "en-GB-RyanNeural"}
+
+# Synthesized chunks are cached on disk by (engine, voice, text)
+tts_cache = TTSCache(
+    cache_dir=os.getenv("TTS_CACHE_DIR", "cache/tts"),
+    max_bytes=int(os.getenv("TTS_CACHE_MB", 1024)) * 1024 * 1024,
+)
+
+# Silence inserted between chunks: longer when the speaker changes
+PAUSE_BETWEEN_SPEAKERS_MS = int(os.getenv("PAUSE_BETWEEN_SPEAKERS_MS", 600))
+PAUSE_WITHIN_TURN_MS = int(os.getenv("PAUSE_WITHIN_TURN_MS", 250))
+
+# Edge TTS returns 24 kHz / 48 kbps mono MP3 for every voice; override per voice if that changes
+DEFAULT_AUDIO_FORMAT = (24000, 48)
+VOICE_AUDIO_FORMATS: Dict[str, Tuple[int, int]] = {}
+
+# MPEG audio Layer III tables: bitrate (kbps) -> index, sample rate -> index
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000]}
 
 # Configure FFmpeg path for pydub
 ffmpeg_default = shutil.which("ffmpeg")
@@ -71,84 +118,157 @@ def split_text_for_tts(text, max_length=200):
     return [c for c in final_chunks if c.strip()]
 
 
-def generate_podcast_script(client, content: str, model: str) -> str:
-    """Generate a podcast script using Groq API."""
-    try:
-        print(f"Generating script with content length: {len(content)}")
-        print("Content preview:", content[:200])
-        
-        # First, generate a detailed outline
-        summary_prompt = f'''Analyze the following content and produce a detailed outline of the main topics, sections, and subtopics that should be covered in a podcast. The outline should be comprehensive and reflect the structure and important points of the content, not just a brief summary. Do NOT include meta-commentary or explanations—just output the outline directly.NEVER output <think> or any commentary:
+SCRIPT_SYSTEM_PROMPT = "You are a podcast script writer that ONLY outputs scripts in Host/Guest format. You never include any meta-commentary, explanations, or thinking out loud. NEVER output <think>. Output ONLY the script lines."
 
-{content[:32000]}'''
+def parse_outline(outline: str, max_sections: int = SCRIPT_MAX_SECTIONS) -> List[str]:
+    """Split an outline into top-level sections (heading plus its sub-points).
 
-        print("Generating summary...")
-        summary_response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a direct and concise podcast content summarizer. You never think out loud or include meta-commentary in your responses. NEVER output <think>."},
-                {"role": "user", "content": summary_prompt}
-            ]
-        )
-        summary = summary_response.choices[0].message.content.strip()
-        print("Summary generated:", summary[:200])
+    Top-level items are unindented lines starting with the strongest marker
+    the outline uses (heading, number, roman numeral, then bullet); other
+    lines belong to the item above. When there are more than
+    ``max_sections`` items, neighbours are merged.
+    """
+    lines = [line for line in outline.splitlines() if line.strip()]
+    markers = [r'#+\s', r'\d+[.)]\s', r'[IVX]+\.\s', r'[-*•]\s']
+    marker = next((m for m in markers if any(re.match(m, line) for line in lines)), None)
+    sections: List[str] = []
+    for line in lines:
+        if (marker and re.match(marker, line)) or not sections:
+            sections.append(line.strip())
+        else:
+            sections[-1] += "\n" + line.rstrip()
+    # A title or preamble before the first item belongs to the opening section
+    if marker and len(sections) > 1 and not re.match(marker, sections[0]):
+        sections[:2] = [sections[0] + "\n" + sections[1]]
+    if len(sections) > max_sections:
+        per_group = -(-len(sections) // max_sections)
+        sections = ["\n".join(sections[i:i + per_group]) for i in range(0, len(sections), per_group)]
+    return sections
+
+def clean_script_lines(raw_script: str) -> List[str]:
+    """Keep only well-formed "Host:"/"Guest:" lines from an LLM response."""
+    lines = []
+    for line in raw_script.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        # Accept "Host:", "Host :", "host:", "guest:" etc.
+        if line.lower().startswith("host:") or line.lower().startswith("host :"):
+            text = line.split(":", 1)[1].strip()
+            if text:
+                lines.append(f"Host: {text}")
+        elif line.lower().startswith("guest:") or line.lower().startswith("guest :"):
+            text = line.split(":", 1)[1].strip()
+            if text:
+                lines.append(f"Guest: {text}")
+    return lines
+
+def generate_section_script(client, model: str, outline: str, section: str, excerpts: str,
+                            position: int, total: int) -> List[str]:
+    """Write the dialogue for one outline section."""
+    if total == 1:
+        flow = "This is the whole episode: open with a short welcome and close with a brief wrap-up."
+    elif position == 0:
+        flow = "This is the opening segment: start with a short welcome and introduce the topic. Do not wrap up the episode."
+    elif position == total - 1:
+        flow = "This is the final segment: continue the conversation without greetings and end with a brief wrap-up of the episode."
+    else:
+        flow = "This is a middle segment: continue the conversation naturally, with no greetings or wrap-up."
+
+    script_prompt = f'''You are writing one segment of a podcast where a Host and a Guest discuss, explain, and explore study material.
+
+FULL EPISODE OUTLINE (for context only):
+{outline}
 
-        # Then, create a conversational script
-        script_prompt = f'''Create a detailed podcast script where a Host and a Guest discuss, explain, and explore the main topics, concepts, and important details from the following content:
+SEGMENT TO WRITE NOW:
+{section}
 
-{content[:32000]}
+SOURCE EXCERPTS FOR THIS SEGMENT:
+{excerpts}
 
 REQUIREMENTS:
-1. The conversation should be natural, engaging, and easy to follow, with both Host and Guest sharing insights, explanations, and thoughts about the material.
-2. Avoid a strict question-and-answer format. Instead, let both speakers contribute to the discussion, clarify points, and build on each other's ideas.
-3. Cover all major sections and topics from the content, explaining them in a way that helps listeners understand and learn.
-4. Do not summarize too briefly; instead, aim to explain and elaborate on the material.
-5. There is no strict limit on the number of exchanges—make the conversation as long as needed to cover the material well.
-6. Every line MUST start with exactly "Host:" or "Guest:" (case-insensitive, no spaces before colon).
-7. Do NOT include any meta-commentary, explanations, <think>, or instructions.
-8. Do NOT include any placeholders or [brackets].
-9. Output ONLY the script lines, nothing else.
+1. {flow}
+2. The conversation should be natural, engaging, and easy to follow, with both Host and Guest sharing insights, explanations, and thoughts about the material.
+3. Avoid a strict question-and-answer format. Instead, let both speakers contribute to the discussion, clarify points, and build on each other's ideas.
+4. Cover every point of this segment, explaining and elaborating on it with details from the source excerpts. Do not cover other segments.
+5. Every line MUST start with exactly "Host:" or "Guest:" (case-insensitive, no spaces before colon).
+6. Do NOT include any meta-commentary, explanations, <think>, or instructions.
+7. Do NOT include any placeholders or [brackets].
+8. Output ONLY the script lines, nothing else.
 
 OUTPUT THE SCRIPT DIRECTLY, NO COMMENTARY OR HEADERS:'''
-        
-        print("Generating conversation script...")
+
+    with stage("podcast", "script_section"):
         script_response = client.chat.completions.create(
             model=model,
             messages=[
-                {"role": "system", "content": "You are a podcast script writer that ONLY outputs scripts in Host/Guest format. You never include any meta-commentary, explanations, or thinking out loud. NEVER output <think>. Output ONLY the script lines."},
+                {"role": "system", "content": SCRIPT_SYSTEM_PROMPT},
                 {"role": "user", "content": script_prompt}
             ],
             temperature=0.7,  # Add some creativity but not too much
-            max_tokens=2000,  # Limit length to avoid cut-off
+            max_tokens=2000,  # Per segment, so longer documents get longer episodes
         )
+    raw_script = script_response.choices[0].message.content.strip()
+    lines = clean_script_lines(raw_script)
+    if not lines:
+        print(f"WARNING: Segment {position + 1}/{total} produced no script lines. Raw output was:")
+        print(raw_script[:500])
+    return lines
+
+def generate_podcast_script(client, content: str, model: str) -> str:
+    """Generate a podcast script using Groq API.
+
+    An outline of the content is generated first; each of its top-level
+    sections is then scripted concurrently (``SCRIPT_CONCURRENCY`` calls at
+    once) from the source passages most relevant to it, and the segments are
+    joined in outline order. ``content`` must already fit the prompt window;
+    callers condense longer notes first.
+    """
+    try:
+        print(f"Generating script with content length: {len(content)}")
+        print("Content preview:", content[:200])
         
-        raw_script = script_response.choices[0].message.content.strip()
-        print("Raw script from Groq:", raw_script[:300])
-        
-        # Clean up the script
-        lines = []
-        for line in raw_script.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            # Accept "Host:", "Host :", "host:", "guest:" etc.
-            if line.lower().startswith("host:") or line.lower().startswith("host :"):
-                text = line.split(":", 1)[1].strip()
-                if text:
-                    lines.append(f"Host: {text}")
-            elif line.lower().startswith("guest:") or line.lower().startswith("guest :"):
-                text = line.split(":", 1)[1].strip()
-                if text:
-                    lines.append(f"Guest: {text}")
+        # First, generate a detailed outline
+        summary_prompt = f'''Analyze the following content and produce a detailed outline of the main topics, sections, and subtopics that should be covered in a podcast. The outline should be comprehensive and reflect the structure and important points of the content, not just a brief summary. Put each main section on its own unindented line starting with "## ", followed by its indented sub-points. Do NOT include meta-commentary or explanations—just output the outline directly.NEVER output <think> or any commentary:
+
+{content}'''
+
+        print("Generating summary...")
+        with stage("podcast", "outline"):
+            summary_response = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": "You are a direct and concise podcast content summarizer. You never think out loud or include meta-commentary in your responses. NEVER output <think>."},
+                    {"role": "user", "content": summary_prompt}
+                ]
+            )
+        summary = summary_response.choices[0].message.content.strip()
+        print("Summary generated:", summary[:200])
+
+        # Then, script each outline section against the passages it covers
+        sections = parse_outline(summary) or [summary]
+        index = NoteIndex.build([content])
+        excerpts = [
+            "\n\n".join(p["text"] for p in index.search(section, top_k=SCRIPT_EXCERPTS_PER_SECTION))
+            for section in sections
+        ]
+
+        print(f"Generating conversation script in {len(sections)} segments...")
+        with ThreadPoolExecutor(max_workers=max(1, min(SCRIPT_CONCURRENCY, len(sections)))) as pool:
+            futures = [
+                pool.submit(generate_section_script, client, model, summary, section, excerpts[i], i, len(sections))
+                for i, section in enumerate(sections)
+            ]
+            lines = [line for future in futures for line in future.result()]
         
         script = '\n'.join(lines)
         print("Cleaned script, length:", len(script))
         print("Cleaned script preview:", script[:300])
         
-        # If script is empty, log the raw script for debugging
+        # If script is empty, log the outline for debugging
         if not script.strip():
-            print("WARNING: Cleaned script is empty! Raw script was:")
-            print(raw_script)
+            print("WARNING: Cleaned script is empty! Outline was:")
+            print(summary)
             raise Exception("Script generated by Groq API was empty or invalid. See logs for raw output.")
         
         return script
@@ -157,12 +277,234 @@ OUTPUT THE SCRIPT DIRECTLY, NO COMMENTARY OR HEADERS:'''
         print(f"Error in generate_podcast_script: {str(e)}")
         raise
 
-async def synthesize_edge_tts(text, voice, outfile):
+async def stream_edge_tts(text: str, voice: str) -> bytes:
+    """Synthesize ``text`` and return the MP3 bytes without touching disk."""
     communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(outfile)
+    audio = bytearray()
+    async for message in communicate.stream():
+        if message["type"] == "audio":
+            audio += message["data"]
+    return bytes(audio)
+
+def synthesize_gtts(text: str) -> bytes:
+    """Synthesize ``text`` with gTTS into memory (blocking; run it in a thread)."""
+    buffer = io.BytesIO()
+    gtts.gTTS(text=text, lang='en').write_to_fp(buffer)
+    return buffer.getvalue()
+
+@lru_cache(maxsize=64)
+def silent_mp3(duration_ms: int, sample_rate: int = 24000, bitrate_kbps: int = 48) -> bytes:
+    """Return mono MP3 frames that decode to ``duration_ms`` of silence.
+
+    Frames are built directly (header + zeroed side info and main data), so
+    no TTS call or encoder is needed. Results are cached per duration and format.
+    """
+    version = 1 if sample_rate in _MP3_SAMPLE_RATES[1] else 2
+    if sample_rate not in _MP3_SAMPLE_RATES[version] or bitrate_kbps not in _MP3_BITRATES[version]:
+        raise ValueError(f"Unsupported MP3 format: {sample_rate} Hz / {bitrate_kbps} kbps")
+    samples_per_frame = 1152 if version == 1 else 576
+    frame_numerator = (samples_per_frame // 8) * bitrate_kbps * 1000
+    frame_count = max(1, round(duration_ms * sample_rate / 1000 / samples_per_frame))
+    header1 = 0xFB if version == 1 else 0xF3  # sync, version, Layer III, no CRC
+    bitrate_bits = _MP3_BITRATES[version].index(bitrate_kbps) << 4
+    rate_bits = _MP3_SAMPLE_RATES[version].index(sample_rate) << 2
+
+    base_len = frame_numerator // sample_rate
+    frames = bytearray()
+    for n in range(frame_count):
+        # The padding bit absorbs fractional frame lengths (e.g. at 44.1 kHz)
+        frame_len = (n + 1) * frame_numerator // sample_rate - n * frame_numerator // sample_rate
+        padding = frame_len - base_len
+        header = bytes([0xFF, header1, bitrate_bits | rate_bits | (padding << 1), 0xC0])
+        frames += header + bytes(frame_len - len(header))
+    return bytes(frames)
+
+def pause_audio(duration_ms: int, voice: Optional[str] = None) -> bytes:
+    """Silence matching the output format of ``voice``."""
+    sample_rate, bitrate_kbps = VOICE_AUDIO_FORMATS.get(voice, DEFAULT_AUDIO_FORMAT)
+    return silent_mp3(duration_ms, sample_rate, bitrate_kbps)
+
+class VoiceRateLimiter:
+    """Space out request starts per voice by at least ``min_interval`` seconds."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def wait(self, voice: str) -> None:
+        lock = self._locks.setdefault(voice, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(voice, now))
+            self._next_slot[voice] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class TTSScheduler:
+    """Run TTS requests concurrently with bounded parallelism, per-voice rate
+    limiting and jittered retries."""
+
+    def __init__(self, concurrency: int = TTS_CONCURRENCY, voice_interval: float = TTS_VOICE_INTERVAL,
+                 retries: int = TTS_RETRIES, backoff: float = TTS_RETRY_BACKOFF,
+                 cache: Optional[TTSCache] = tts_cache):
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self.limiter = VoiceRateLimiter(voice_interval)
+        self.retries = retries
+        self.backoff = backoff
+
+    async def _store(self, engine: str, voice: str, text: str, audio: bytes) -> None:
+        if self.cache is None:
+            return
+        try:
+            await asyncio.to_thread(self.cache.put, engine, voice, text, audio)
+        except OSError as e:
+            print(f"Could not cache TTS audio: {e}")
+
+    async def _try_voice(self, text: str, voice: str) -> Optional[bytes]:
+        for attempt in range(self.retries + 1):
+            await self.limiter.wait(voice)
+            try:
+                audio = await stream_edge_tts(text, voice)
+                if audio:
+                    return audio
+                print(f"Empty audio with voice {voice}")
+            except Exception as e:
+                print(f"Error generating with voice {voice} (attempt {attempt + 1}): {e}")
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+        return None
+
+    async def synthesize(self, text: str, voices: List[str], gtts_fallback: bool = True) -> Optional[bytes]:
+        """Synthesize ``text``, trying each voice then gTTS. Returns the MP3 bytes or None.
+
+        The phrase cache is checked for every candidate before any network call.
+        """
+        start = time.perf_counter()
+        audio, source = await self._synthesize(text, [voice for voice in voices if voice], gtts_fallback)
+        TTS_CHUNK_SECONDS.labels(source).observe(time.perf_counter() - start)
+        return audio
+
+    async def _synthesize(self, text: str, voices: List[str], gtts_fallback: bool) -> Tuple[Optional[bytes], str]:
+        # Returns the audio and where it came from (cache, edge, gtts or failed)
+        candidates = [("edge", voice) for voice in voices] + ([("gtts", "en")] if gtts_fallback else [])
+        if self.cache is not None:
+            audio = await asyncio.to_thread(self.cache.lookup, text, candidates)
+            if audio:
+                return audio, "cache"
+        async with self.semaphore:
+            for voice in voices:
+                audio = await self._try_voice(text, voice)
+                if audio:
+                    await self._store("edge", voice, text, audio)
+                    return audio, "edge"
+            if not gtts_fallback:
+                return None, "failed"
+            print("Edge TTS failed, trying gTTS fallback")
+            try:
+                audio = await asyncio.to_thread(synthesize_gtts, text)
+                if audio:
+                    print("gTTS fallback succeeded")
+                    await self._store("gtts", "en", text, audio)
+                    return audio, "gtts"
+                print("gTTS fallback generated empty audio")
+            except Exception as e_tts:
+                print(f"gTTS fallback failed: {e_tts}")
+            return None, "failed"
+
+_scheduler: Optional[Tuple[asyncio.AbstractEventLoop, TTSScheduler]] = None
+
+def get_tts_scheduler() -> TTSScheduler:
+    """The scheduler shared by every podcast job on the running event loop.
+
+    Sharing it keeps ``TTS_CONCURRENCY`` and the per-voice spacing global to
+    the process rather than per job. Its semaphore and locks belong to one
+    loop, so a new loop (e.g. a fresh ``asyncio.run``) gets a new scheduler.
+    """
+    global _scheduler
+    loop = asyncio.get_running_loop()
+    if _scheduler is None or _scheduler[0] is not loop:
+        _scheduler = (loop, TTSScheduler())
+    return _scheduler[1]
+
+class OrderedAudioWriter:
+    """Append chunk audio to a podcast file in script order as chunks finish.
+
+    Chunks that finish early wait in memory until every earlier chunk has
+    been written; the file is written as ``<path>.part`` and renamed on close.
+    """
 
-async def create_audio(script: str, task_id: str) -> str:
-    """Create audio file from the podcast script using edge-tts."""
+    def __init__(self, output_path: str, jobs: List[tuple]):
+        self.output_path = output_path
+        self.part_path = output_path + ".part"
+        self.jobs = jobs
+        self.chunks_written = 0
+        self.bytes_written = 0
+        self._ready: Dict[int, Optional[bytes]] = {}
+        self._next = 0
+        self._previous_segment = None
+        self._file = open(self.part_path, "wb")
+
+    def _append(self, data: bytes) -> None:
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def add(self, job_idx: int, audio: Optional[bytes]) -> int:
+        """Record the result for ``job_idx`` and write whatever is now in order.
+
+        Returns how many jobs were flushed (including failed ones, which are skipped).
+        """
+        self._ready[job_idx] = audio
+        flushed = 0
+        while self._next in self._ready:
+            audio = self._ready.pop(self._next)
+            segment_idx, _, _, voice = self.jobs[self._next]
+            if audio:
+                if self.chunks_written:
+                    same_turn = segment_idx == self._previous_segment
+                    self._append(pause_audio(PAUSE_WITHIN_TURN_MS if same_turn else PAUSE_BETWEEN_SPEAKERS_MS, voice))
+                self._append(audio)
+                self._previous_segment = segment_idx
+                self.chunks_written += 1
+            self._next += 1
+            flushed += 1
+        if flushed:
+            self._file.flush()
+        return flushed
+
+    @property
+    def jobs_done(self) -> int:
+        """Jobs written (or skipped) so far, in script order."""
+        return self._next
+
+    def close(self) -> bool:
+        """Finish the file. Returns False (and removes it) if no audio was written."""
+        self._file.close()
+        if not self.chunks_written:
+            os.remove(self.part_path)
+            return False
+        os.replace(self.part_path, self.output_path)
+        return True
+
+    def abort(self) -> None:
+        """Drop the partial file without publishing it."""
+        self._file.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+def podcast_output_path(task_id: str) -> str:
+    """Where ``create_audio`` writes a podcast (``<path>.part`` while in progress)."""
+    return f"podcasts/podcast_{task_id}.mp3"
+
+async def create_audio(script: str, task_id: str,
+                       on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None) -> str:
+    """Create audio file from the podcast script using edge-tts.
+
+    ``on_progress(done, total)`` is awaited whenever more chunks have been
+    written to the output file. Raises if the audio can't be generated, so
+    the job fails rather than publishing a truncated or silent episode.
+    """
     try:
         print(f"Creating audio for script length: {len(script)}")
         print("Script preview:", script[:200])
@@ -230,13 +572,8 @@ async def create_audio(script: str, task_id: str) -> str:
         # Create output directory if it doesn't exist
         os.makedirs("podcasts", exist_ok=True)
         
-        # Create temporary directory for segment files
-        temp_dir = os.path.join("podcasts", "temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Generate audio segments with different voices using edge-tts
-        audio_segments = []
-        seg_number = 0
+        # Plan every chunk up front so they can be synthesized concurrently
+        jobs = []
         for i, (speaker, text) in enumerate(segments):
             if not text.strip():
                 print(f"Skipping empty segment {i+1} for {speaker}")
@@ -246,104 +583,56 @@ async def create_audio(script: str, task_id: str) -> str:
                 if not chunk:
                     print(f"Skipping chunk {chunk_idx+1} of segment {i+1} after sanitization (empty text)")
                     continue
-                seg_number += 1
-                print(f"[AUDIO GEN] Segment {i+1} Chunk {chunk_idx+1} Speaker={speaker}, Length={len(chunk)}, Text='{chunk[:50]}'")
-                print(f"[DEBUG] chunk repr: {repr(chunk)}")
-                print(f"[DEBUG] chunk type: {type(chunk)}")
-                print(f"[DEBUG] chunk length: {len(chunk)}")
-                temp_path = os.path.join(temp_dir, f"segment_{i}_{chunk_idx}.mp3")
-                # Use primary and fallback voices for host/guest
-                primary_voice = "en-US-GuyNeural" if speaker == "host" else "en-GB-LibbyNeural"
-                fallback_map = {"en-US-GuyNeural": "en-US-AriaNeural", "en-GB-LibbyNeural": "en-GB-RyanNeural"}
-                voices = [primary_voice, fallback_map.get(primary_voice)]
-                success = False
-                # Try primary and fallback voices; skip chunk if both fail
-                for v in voices:
-                    try:
-                        await synthesize_edge_tts(chunk, v, temp_path)
-                        await asyncio.sleep(0.5)
-                        if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
-                            success = True
-                            break
-                        print(f"Empty audio with voice {v}")
-                    except Exception as e2:
-                        print(f"Error generating with voice {v}: {e2}")
-                        # Continue to next voice
-                        continue
-                # Fallback to gTTS if Edge TTS fails
-                if not success:
-                    print(f"Edge TTS failed for segment {i+1} chunk {chunk_idx+1}, trying gTTS fallback")
-                    try:
-                        tts = gtts.gTTS(text=chunk, lang='en')
-                        tts.save(temp_path)
-                        if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
-                            success = True
-                            print(f"gTTS fallback succeeded for chunk {chunk_idx+1}")
-                        else:
-                            print(f"gTTS fallback generated empty file for chunk {chunk_idx+1}")
-                    except Exception as e_tts:
-                        print(f"gTTS fallback failed for chunk {chunk_idx+1}: {e_tts}")
-                if not success:
-                    print(f"Skipping segment {i+1} chunk {chunk_idx+1}: no audio generated after fallback")
-                    continue
-                # Add pause between segments
-                if seg_number > 1:
-                    pause_path = os.path.join(temp_dir, f"pause_{i}_{chunk_idx}.mp3")
-                    try:
-                        await synthesize_edge_tts("...", primary_voice, pause_path)
-                        await asyncio.sleep(0.2)
-                        if os.path.exists(pause_path) and os.path.getsize(pause_path) > 0:
-                            with open(pause_path, 'rb') as f:
-                                audio_segments.append(f.read())
-                        else:
-                            print(f"Skipping pause audio: file empty or missing")
-                    except Exception as e_pause:
-                        print(f"Error generating pause audio: {e_pause}")
-                    finally:
-                        if os.path.exists(pause_path):
-                            os.remove(pause_path)
-                # Add segment audio
-                with open(temp_path, 'rb') as f:
-                    audio_segments.append(f.read())
-                os.remove(temp_path)
-        
-        if not audio_segments:
-            print("No audio segments were generated; creating silent fallback audio")
-            # Create a 1-second silent audio segment as fallback
-            from pydub import AudioSegment as _AudioSegment
-            silent = _AudioSegment.silent(duration=1000)
-            output_path = f"podcasts/podcast_{task_id}.mp3"
-            silent.export(output_path, format="mp3")
-            print(f"Silent audio saved to {output_path}")
-            return output_path
-        
-        # Combine all segments into final audio file
-        output_path = f"podcasts/podcast_{task_id}.mp3"
+                primary_voice = HOST_VOICE if speaker == "host" else GUEST_VOICE
+                jobs.append((i, chunk_idx, chunk, primary_voice))
+        print(f"Synthesizing {len(jobs)} chunks with concurrency {TTS_CONCURRENCY}")
+
+        output_path = podcast_output_path(task_id)
         print(f"Generating final audio file at: {output_path}")
-        
-        with open(output_path, 'wb') as f:
-            for segment in audio_segments:
-                f.write(segment)
-        
-        # Clean up temp directory
+        scheduler = get_tts_scheduler()
+        writer = OrderedAudioWriter(output_path, jobs)
+        # Bound how far synthesis may run ahead of the writer, and with it buffered audio
+        window = asyncio.Semaphore(max(TTS_CONCURRENCY * 2, 1))
+
+        async def synthesize_job(job_idx: int, job) -> None:
+            i, chunk_idx, chunk, primary_voice = job
+            print(f"[AUDIO GEN] Segment {i+1} Chunk {chunk_idx+1} Voice={primary_voice}, Length={len(chunk)}, Text='{chunk[:50]}'")
+            audio = None
+            try:
+                audio = await scheduler.synthesize(chunk, [primary_voice, FALLBACK_VOICES.get(primary_voice)])
+                if not audio:
+                    print(f"Skipping segment {i+1} chunk {chunk_idx+1}: no audio generated after fallback")
+            finally:
+                flushed = writer.add(job_idx, audio)
+                for _ in range(flushed):
+                    window.release()
+            if flushed and on_progress:
+                await on_progress(writer.jobs_done, len(jobs))
+
+        tasks = []
         try:
-            os.rmdir(temp_dir)
-        except:
-            pass
+            for job_idx, job in enumerate(jobs):
+                await window.acquire()
+                tasks.append(asyncio.create_task(synthesize_job(job_idx, job)))
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Cancelled chunks still hand their result to the writer; let them before closing it
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.abort()
+            raise
+        wrote_audio = writer.close()
+
+        if not wrote_audio:
+            raise Exception("No audio could be generated for any segment")
         
         print("Audio file created successfully")
         return output_path
     
     except Exception as e:
         print(f"Error in create_audio: {e}")
-        # Fallback to silent audio on any error
-        print("Creating 1-second silent fallback audio due to error.")
-        from pydub import AudioSegment as _AudioSegment
-        silent = _AudioSegment.silent(duration=1000)
-        output_path = f"podcasts/podcast_{task_id}.mp3"
-        silent.export(output_path, format="mp3")
-        print(f"Silent fallback audio saved to {output_path}")
-        return output_path
+        raise
 
 def add_background_music(audio_path: str, music_path: str, output_path: str):
     """Add background music to the podcast."""
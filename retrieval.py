@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a about an and are as at be by can do does for from has have how i in is it its of on or "
+    "that the their this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with common stopwords removed."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def chunk_pages(pages: List[str], chunk_chars: int = 1200, overlap_chars: int = 200) -> List[Dict]:
+    """Split cleaned page texts into overlapping chunks that never cross a page.
+
+    Returns a list of ``{"text": ..., "page": n}`` dicts with 1-based page numbers.
+    """
+    chunks = []
+    step = max(chunk_chars - overlap_chars, 1)
+    for page_number, page_text in enumerate(pages, start=1):
+        page_text = page_text.strip()
+        start = 0
+        while start < len(page_text):
+            end = min(start + chunk_chars, len(page_text))
+            # Prefer to break on a word boundary
+            if end < len(page_text):
+                space = page_text.rfind(" ", start + step, end)
+                if space != -1:
+                    end = space
+            chunks.append({"text": page_text[start:end].strip(), "page": page_number})
+            if end >= len(page_text):
+                break
+            # Start the overlap on a word boundary too
+            next_start = page_text.find(" ", end - overlap_chars, end) + 1
+            start = max(next_start or end - overlap_chars, start + 1)
+    return [c for c in chunks if c["text"]]
+
+
+class NoteIndex:
+    """BM25 index over the chunks of one note.
+
+    Postings are kept in CSR form (``term_ptr`` / ``postings_chunk`` /
+    ``postings_tf``) so scoring a query is a handful of NumPy gathers.
+    """
+
+    def __init__(self, chunks: List[Dict], vocab: Dict[str, int], term_ptr: np.ndarray,
+                 postings_chunk: np.ndarray, postings_tf: np.ndarray, chunk_len: np.ndarray,
+                 k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.vocab = vocab
+        self.term_ptr = term_ptr
+        self.postings_chunk = postings_chunk
+        self.postings_tf = postings_tf
+        self.chunk_len = chunk_len
+        self.k1 = k1
+        self.b = b
+        n = len(chunks)
+        df = np.diff(term_ptr).astype(np.float32)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_len = float(chunk_len.mean()) if n else 0.0
+        self._len_norm = (k1 * (1 - b + b * chunk_len / avg_len)).astype(np.float32) if avg_len else chunk_len
+
+    @classmethod
+    def build(cls, pages: List[str], chunk_chars: int = 1200, overlap_chars: int = 200) -> "NoteIndex":
+        chunks = chunk_pages(pages, chunk_chars, overlap_chars)
+        vocab: Dict[str, int] = {}
+        postings: List[List[tuple]] = []
+        chunk_len = np.zeros(len(chunks), dtype=np.float32)
+        for chunk_idx, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            chunk_len[chunk_idx] = sum(counts.values())
+            for term, tf in counts.items():
+                term_id = vocab.setdefault(term, len(vocab))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((chunk_idx, tf))
+        term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        term_ptr[1:] = np.cumsum([len(p) for p in postings])
+        flat = [entry for plist in postings for entry in plist]
+        postings_chunk = np.array([c for c, _ in flat], dtype=np.int32)
+        postings_tf = np.array([tf for _, tf in flat], dtype=np.float32)
+        return cls(chunks, vocab, term_ptr, postings_chunk, postings_tf, chunk_len)
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+        """Return up to ``top_k`` chunks ranked by BM25 score, best first.
+
+        Falls back to the opening chunks when no query term is in the note.
+        """
+        if not self.chunks:
+            return []
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        matched = False
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            matched = True
+            lo, hi = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            docs = self.postings_chunk[lo:hi]
+            tf = self.postings_tf[lo:hi]
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self._len_norm[docs])
+        if not matched:
+            return [dict(c, score=0.0) for c in self.chunks[:top_k]]
+        top_k = min(top_k, len(self.chunks))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [dict(self.chunks[i], score=float(scores[i])) for i in best if scores[i] > 0]
+
+    def save(self, path_prefix: str) -> None:
+        """Write the index as ``<prefix>.npz`` (arrays) and ``<prefix>.json`` (chunks, vocab)."""
+        # Unique temp names: the web process and an ingestion worker may build the same digest
+        tmp_prefix = f"{path_prefix}.{uuid4().hex}.tmp"
+        np.savez_compressed(
+            tmp_prefix + ".npz",
+            term_ptr=self.term_ptr,
+            postings_chunk=self.postings_chunk,
+            postings_tf=self.postings_tf,
+            chunk_len=self.chunk_len,
+        )
+        with open(tmp_prefix + ".json", "w", encoding="utf-8") as f:
+            json.dump({"chunks": self.chunks, "vocab": self.vocab}, f)
+        os.replace(tmp_prefix + ".npz", path_prefix + ".npz")
+        os.replace(tmp_prefix + ".json", path_prefix + ".json")
+
+    @classmethod
+    def load(cls, path_prefix: str) -> "NoteIndex":
+        with open(path_prefix + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(path_prefix + ".npz") as arrays:
+            return cls(meta["chunks"], meta["vocab"], arrays["term_ptr"], arrays["postings_chunk"],
+                       arrays["postings_tf"], arrays["chunk_len"])
+
+
+class NoteIndexStore:
+    """Content-addressed on-disk store of note indexes with a small in-memory LRU.
+
+    The files on disk are capped at ``max_disk_bytes``, evicting the least
+    recently used indexes; an evicted index is rebuilt from the note text
+    the next time it is needed.
+    """
+
+    def __init__(self, index_dir: str = "cache/indexes", max_loaded: int = 32,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.index_dir = index_dir
+        self.max_loaded = max_loaded
+        self.max_disk_bytes = max_disk_bytes
+        self._loaded: "OrderedDict[str, NoteIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _prefix(self, digest: str) -> str:
+        return os.path.join(self.index_dir, digest)
+
+    def _remember(self, digest: str, index: NoteIndex) -> None:
+        self._loaded[digest] = index
+        self._loaded.move_to_end(digest)
+        while len(self._loaded) > self.max_loaded:
+            self._loaded.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        indexes: Dict[str, List] = {}
+        total = 0
+        for name in os.listdir(self.index_dir):
+            digest, ext = os.path.splitext(name)
+            if ext not in (".npz", ".json") or ".tmp" in name:
+                continue
+            path = os.path.join(self.index_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entry = indexes.setdefault(digest, [0.0, 0, []])
+            entry[0] = max(entry[0], st.st_mtime)
+            entry[1] += st.st_size
+            entry[2].append(path)
+            total += st.st_size
+        if total <= self.max_disk_bytes:
+            return
+        # mtime doubles as the LRU clock, as in the note text cache
+        for digest, (_, size, paths) in sorted(indexes.items(), key=lambda item: item[1][0]):
+            if total <= self.max_disk_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            logger.info(f"Evicted retrieval index {digest[:12]} from disk")
+
+    def build(self, digest: str, pages: List[str]) -> NoteIndex:
+        """Build and persist the index for a document's pages."""
+        index = NoteIndex.build(pages)
+        index.save(self._prefix(digest))
+        logger.info(f"Built retrieval index {digest[:12]} with {len(index.chunks)} chunks")
+        self._evict_disk()
+        with self._lock:
+            self._remember(digest, index)
+        return index
+
+    def get(self, digest: str, pages: Optional[List[str]] = None) -> Optional[NoteIndex]:
+        """Return the index for ``digest``, building it from ``pages`` if it is missing."""
+        with self._lock:
+            index = self._loaded.get(digest)
+            if index is not None:
+                self._loaded.move_to_end(digest)
+                return index
+        try:
+            index = NoteIndex.load(self._prefix(digest))
+            for ext in (".npz", ".json"):
+                os.utime(self._prefix(digest) + ext)
+        except FileNotFoundError:
+            if pages is None:
+                return None
+            return self.build(digest, pages)
+        with self._lock:
+            self._remember(digest, index)
+        return index
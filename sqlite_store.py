@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+class SQLiteStore:
+    """Base for the app's SQLite-backed stores.
+
+    Each thread gets its own connection in autocommit mode with WAL
+    journaling, so readers in the web process proceed while workers write.
+    Subclasses set ``schema`` (run on open) and may set ``row_factory``.
+    """
+
+    schema = ""
+    row_factory: Optional[type] = None
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.schema)
+
+    @contextmanager
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        yield conn
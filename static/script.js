@@ -109,8 +109,8 @@ document.addEventListener('DOMContentLoaded', () => {
             const data = await response.json();
             currentTaskId = data.task_id;
 
-            // Start polling for status
-            pollStatus();
+            // Follow progress events (falls back to polling)
+            watchStatus();
         } catch (error) {
             console.error('Error:', error);
             progressMessage.textContent = 'Error: ' + error.message;
@@ -133,6 +133,72 @@ document.addEventListener('DOMContentLoaded', () => {
         progressBar.style.width = `${end}%`;
     }
 
+    // Show a status payload; returns true once the job has finished
+    async function showStatus(data) {
+        // Simulate smoother progress bar
+        let targetProgress = 0;
+        if (data.progress) {
+            targetProgress = Math.floor(data.progress * 100);
+        }
+        const currentWidth = parseFloat(progressBar.style.width) || 0;
+        if (targetProgress > currentWidth) {
+            // Animate progress bar more slowly
+            await animateProgressBar(currentWidth, targetProgress, 600);
+        }
+        progressMessage.textContent = data.message;
+
+        if (data.status === 'completed') {
+            await animateProgressBar(parseFloat(progressBar.style.width) || 0, 100, 800);
+            // Show result section
+            progressSection.classList.add('hidden');
+            resultSection.classList.remove('hidden');
+
+            // Set up audio player
+            const audioUrl = `/get_podcast/${currentTaskId}`;
+            podcastPlayer.src = audioUrl;
+
+            // Set up download button
+            downloadBtn.onclick = () => {
+                window.location.href = audioUrl;
+            };
+            return true;
+        } else if (data.status === 'failed') {
+            progressMessage.textContent = 'Error: ' + data.message;
+            return true;
+        }
+        return false;
+    }
+
+    // Receive status updates pushed by the server
+    function watchStatus() {
+        if (!currentTaskId) return;
+        if (!window.EventSource) {
+            pollStatus();
+            return;
+        }
+
+        const source = new EventSource(`/podcast_events/${currentTaskId}`);
+        let finished = false;
+        // Apply updates one at a time so progress bar animations don't overlap
+        let updates = Promise.resolve();
+        const onStatus = (event) => {
+            const data = JSON.parse(event.data);
+            if (data.status === 'completed' || data.status === 'failed') {
+                finished = true;
+                source.close();
+            }
+            updates = updates.then(() => showStatus(data));
+        };
+        ['progress', 'completed', 'failed'].forEach(name => source.addEventListener(name, onStatus));
+        source.onerror = () => {
+            source.close();
+            if (!finished) {
+                // Stream unavailable (e.g. a proxy buffers it); poll instead
+                updates.then(pollStatus);
+            }
+        };
+    }
+
     // Poll for podcast status
     async function pollStatus() {
         if (!currentTaskId) return;
@@ -141,35 +207,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const response = await fetch(`/podcast_status/${currentTaskId}`);
             const data = await response.json();
 
-            // Simulate smoother progress bar
-            let targetProgress = 0;
-            if (data.progress) {
-                targetProgress = Math.floor(data.progress * 100);
-            }
-            const currentWidth = parseFloat(progressBar.style.width) || 0;
-            if (targetProgress > currentWidth) {
-                // Animate progress bar more slowly
-                await animateProgressBar(currentWidth, targetProgress, 600);
-            }
-            progressMessage.textContent = data.message;
-
-            if (data.status === 'completed') {
-                await animateProgressBar(parseFloat(progressBar.style.width) || 0, 100, 800);
-                // Show result section
-                progressSection.classList.add('hidden');
-                resultSection.classList.remove('hidden');
-
-                // Set up audio player
-                const audioUrl = `/get_podcast/${currentTaskId}`;
-                podcastPlayer.src = audioUrl;
-
-                // Set up download button
-                downloadBtn.onclick = () => {
-                    window.location.href = audioUrl;
-                };
-            } else if (data.status === 'failed') {
-                progressMessage.textContent = 'Error: ' + data.message;
-            } else {
+            if (!(await showStatus(data))) {
                 // Continue polling
                 setTimeout(pollStatus, 1000);
             }
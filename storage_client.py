@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient upstream failures
+_RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class StorageError(Exception):
+    """A download failed; ``status_code`` is the HTTP status to report to our client."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class FetchResult:
+    content: Optional[bytes]
+    etag: Optional[str]
+    not_modified: bool = False
+
+
+class StorageClient:
+    """Pooled keep-alive client for downloading note files from Supabase Storage.
+
+    Downloads are streamed into memory and abandoned as soon as they exceed
+    ``max_bytes``. Passing the ETag from an earlier download makes the
+    request conditional, so an unchanged file costs a 304 and no body.
+    Timeouts, connection errors, 429 and 5xx responses are retried with
+    exponential backoff and jitter.
+    """
+
+    def __init__(self, max_bytes: int = 50 * 1024 * 1024, timeout: float = 15.0, retries: int = 2,
+                 backoff: float = 0.5, max_connections: int = 100, max_keepalive: int = 20):
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            follow_redirects=True,
+        )
+
+    async def _download(self, url: str, etag: Optional[str]) -> FetchResult:
+        headers = {"If-None-Match": etag} if etag else {}
+        async with self._client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return FetchResult(content=None, etag=etag, not_modified=True)
+            response.raise_for_status()
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise StorageError(413, f"File exceeds the maximum download size of {self.max_bytes} bytes")
+            buffer = bytearray()
+            async for data in response.aiter_bytes():
+                buffer += data
+                if len(buffer) > self.max_bytes:
+                    raise StorageError(413, f"File exceeds the maximum download size of {self.max_bytes} bytes")
+            return FetchResult(content=bytes(buffer), etag=response.headers.get("etag"))
+
+    async def fetch(self, url: str, etag: Optional[str] = None) -> FetchResult:
+        """Download ``url`` (conditionally when ``etag`` is given). Raises StorageError."""
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._download(url, etag)
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status not in _RETRY_STATUSES or attempt == self.retries:
+                    raise StorageError(404 if status == 404 else 500, f"Error downloading file: {str(e)}")
+                error = e
+            except httpx.TimeoutException as e:
+                if attempt == self.retries:
+                    raise StorageError(504, "Timed out while downloading file")
+                error = e
+            except httpx.TransportError as e:
+                if attempt == self.retries:
+                    raise StorageError(500, f"Error downloading file: {str(e)}")
+                error = e
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"Download of {url} failed ({error!r}); retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
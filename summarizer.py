@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from llm_gateway import INTERACTIVE
+from metrics import stage
+from summary_cache import SummaryCache
+
+logger = logging.getLogger(__name__)
+
+MAP_SYSTEM_PROMPT = "You are a precise note-taker condensing one part of a longer study document."
+MAP_PROMPT = (
+    "Condense the following part of a longer document into dense notes. Keep every key concept, "
+    "definition, fact, figure and example; drop filler and repetition. Output only the notes.\n\n{text}"
+)
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Split ``text`` into pieces of at most ``max_chars``, preferring sentence then word breaks."""
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            floor = start + max_chars // 2
+            cut = text.rfind(". ", floor, end)
+            if cut == -1:
+                cut = text.rfind(" ", floor, end)
+            if cut != -1:
+                end = cut + 1
+        piece = text[start:end].strip()
+        if piece:
+            pieces.append(piece)
+        start = end
+    return pieces
+
+
+class CallLimiter:
+    """Bound concurrent calls and space their starts to stay under ``per_minute`` (0 for no rate limit)."""
+
+    def __init__(self, concurrency: int, per_minute: float = 0):
+        self.min_interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._semaphore:
+            if self.min_interval:
+                async with self._lock:
+                    now = time.monotonic()
+                    start = max(now, self._next_slot)
+                    self._next_slot = start + self.min_interval
+                if start > now:
+                    await asyncio.sleep(start - now)
+            yield
+
+
+class MapReduceSummarizer:
+    """Condenses documents that are too long for one prompt.
+
+    Text longer than ``window_chars`` is split into ``chunk_chars`` pieces
+    that are summarized concurrently (at most ``concurrency`` calls through
+    the LLM gateway at once). If the joined chunk summaries are still too
+    long the step repeats on them. Chunk summaries are cached by content, so
+    only the caller's final prompt depends on format or length options.
+    """
+
+    def __init__(self, llm, model: str, cache: Optional[SummaryCache] = None,
+                 window_chars: int = 32000, chunk_chars: int = 12000, concurrency: int = 4,
+                 max_rounds: int = 3):
+        self.llm = llm
+        self.model = model
+        self.cache = cache
+        self.window_chars = window_chars
+        self.chunk_chars = chunk_chars
+        self.max_rounds = max_rounds
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _summarize_chunk(self, text: str, priority: int) -> str:
+        chunk_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get_chunk, chunk_hash, self.model)
+            if cached is not None:
+                return cached
+        async with self._semaphore:
+            with stage("summarizer", "chunk"):
+                response = await self.llm.create(
+                    model=self.model,
+                    priority=priority,
+                    messages=[
+                        {"role": "system", "content": MAP_SYSTEM_PROMPT},
+                        {"role": "user", "content": MAP_PROMPT.format(text=text)}
+                    ]
+                )
+        summary = response.choices[0].message.content.strip()
+        if self.cache is not None:
+            # Under the model that wrote it, so a fallback's notes aren't reused as the primary's
+            await asyncio.to_thread(self.cache.put_chunk, chunk_hash, self.llm.served_model(response), summary)
+        return summary
+
+    async def condense(self, text: str, priority: int = INTERACTIVE) -> str:
+        """Return ``text`` unchanged if it fits the window, otherwise its map-reduced notes."""
+        for round_idx in range(self.max_rounds):
+            if len(text) <= self.window_chars:
+                return text
+            chunks = split_text(text, self.chunk_chars)
+            logger.info(f"Condensing {len(text)} chars in {len(chunks)} chunks (round {round_idx + 1})")
+            summaries = await asyncio.gather(*[self._summarize_chunk(chunk, priority) for chunk in chunks])
+            condensed = "\n\n".join(summaries)
+            if len(condensed) >= len(text):
+                break
+            text = condensed
+        # Give up on further reduction rather than loop; the prompt takes what fits
+        return text[:self.window_chars]
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+create table if not exists summaries (
+    digest text not null,
+    format text not null,
+    length text not null,
+    model text not null,
+    note_id text,
+    summary text not null,
+    created_at real not null,
+    primary key (digest, format, length, model)
+);
+create index if not exists summaries_note_idx on summaries (note_id);
+create index if not exists summaries_created_idx on summaries (created_at);
+create table if not exists chunk_summaries (
+    chunk_hash text not null,
+    model text not null,
+    summary text not null,
+    created_at real not null,
+    primary key (chunk_hash, model)
+);
+"""
+
+
+class SummaryCache(SQLiteStore):
+    """SQLite store of generated summaries keyed by (content hash, format, length, model).
+
+    Entries younger than ``ttl_seconds`` are fresh. Until ``ttl_seconds +
+    stale_seconds`` they are still returned but flagged stale so the caller
+    can serve them while regenerating in the background; after that they are
+    treated as misses.
+
+    Intermediate map-reduce chunk summaries live in a second table keyed by
+    the chunk's own hash, so they survive changes to format or length.
+    """
+
+    schema = _SCHEMA
+
+    def __init__(self, db_path: str = "cache/summaries.db", ttl_seconds: float = 7 * 24 * 3600,
+                 stale_seconds: float = 30 * 24 * 3600):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0, "invalidations": 0,
+                       "chunk_hits": 0, "chunk_misses": 0}
+        super().__init__(db_path)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, digest: str, format: str, length: str, model: str) -> Optional[Tuple[str, bool]]:
+        """Return ``(summary, is_fresh)`` or None if there is no usable entry."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "select summary, created_at from summaries"
+                " where digest = ? and format = ? and length = ? and model = ?",
+                (digest, format, length, model),
+            ).fetchone()
+        age = time.time() - row[1] if row else None
+        if row is None or age > self.ttl_seconds + self.stale_seconds:
+            self._count("misses")
+            return None
+        fresh = age <= self.ttl_seconds
+        self._count("hits" if fresh else "stale_hits")
+        return row[0], fresh
+
+    def put(self, note_id: str, digest: str, format: str, length: str, model: str, summary: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "insert or replace into summaries (digest, format, length, model, note_id, summary, created_at)"
+                " values (?, ?, ?, ?, ?, ?, ?)",
+                (digest, format, length, model, note_id, summary, time.time()),
+            )
+        self._count("stores")
+
+    def get_chunk(self, chunk_hash: str, model: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "select summary from chunk_summaries where chunk_hash = ? and model = ?",
+                (chunk_hash, model),
+            ).fetchone()
+        self._count("chunk_hits" if row else "chunk_misses")
+        return row[0] if row else None
+
+    def put_chunk(self, chunk_hash: str, model: str, summary: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "insert or replace into chunk_summaries (chunk_hash, model, summary, created_at) values (?, ?, ?, ?)",
+                (chunk_hash, model, summary, time.time()),
+            )
+
+    def invalidate(self, note_id: Optional[str] = None, digest: Optional[str] = None) -> int:
+        """Delete the summaries of a note and/or a document. Returns the number removed."""
+        clauses, params = [], []
+        if note_id is not None:
+            clauses.append("note_id = ?")
+            params.append(note_id)
+        if digest is not None:
+            clauses.append("digest = ?")
+            params.append(digest)
+        if not clauses:
+            return 0
+        with self._connect() as conn:
+            removed = conn.execute(f"delete from summaries where {' or '.join(clauses)}", params).rowcount
+        with self._lock:
+            self._stats["invalidations"] += removed
+        return removed
+
+    def purge_expired(self) -> int:
+        """Delete entries too old to be served even as stale."""
+        cutoff = time.time() - self.ttl_seconds - self.stale_seconds
+        with self._connect() as conn:
+            removed = conn.execute("delete from summaries where created_at < ?", (cutoff,)).rowcount
+            removed += conn.execute("delete from chunk_summaries where created_at < ?", (cutoff,)).rowcount
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["stale_hits"] + self._stats["misses"]
+            served = self._stats["hits"] + self._stats["stale_hits"]
+            return {**self._stats, "hit_rate": served / lookups if lookups else 0.0}
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def phrase_key(engine: str, voice: str, text: str) -> str:
+    """Hash identifying one synthesized phrase."""
+    return hashlib.sha256(f"{engine}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Size-capped on-disk cache of synthesized chunk audio.
+
+    Files are stored as ``<cache_dir>/<key[:2]>/<key>.mp3``; a file's mtime is
+    refreshed on every hit and the least recently used files are evicted
+    once the cache grows past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: str = "cache/tts", max_bytes: int = 1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def _scan(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _read(self, engine: str, voice: str, text: str) -> Optional[bytes]:
+        path = self._path(phrase_key(engine, voice, text))
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)  # mtime is the LRU clock
+        except FileNotFoundError:
+            return None
+        return audio or None
+
+    def lookup(self, text: str, candidates: List[Tuple[str, str]]) -> Optional[bytes]:
+        """Return cached audio for the first ``(engine, voice)`` candidate that has ``text``.
+
+        Counts as a single hit or miss regardless of how many candidates are checked.
+        """
+        audio = None
+        for engine, voice in candidates:
+            audio = self._read(engine, voice, text)
+            if audio:
+                break
+        with self._lock:
+            self._stats["hits" if audio else "misses"] += 1
+        return audio
+
+    def put(self, engine: str, voice: str, text: str, audio: bytes) -> None:
+        """Store synthesized audio for the phrase, evicting old entries if needed."""
+        if not audio or len(audio) > self.max_bytes:
+            return
+        path = self._path(phrase_key(engine, voice, text))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            previous = os.path.getsize(path)
+        except FileNotFoundError:
+            previous = 0
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._stats["stores"] += 1
+            self._total_bytes += len(audio) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Drop to 90% of the cap so eviction doesn't run on every store
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._scan())
+        self._total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._total_bytes -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "bytes": self._total_bytes,
+            }
@@ -166,6 +166,18 @@ export default function FileUpload({ onFilesSelected, onFileUploaded, className
           }
           
           console.log('Note created:', noteData);
+
+          // Preprocess the note in the background so the first chat/summary is fast
+          fetch('/api/ingest_note', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ note_id: noteData.id })
+          })
+            .then(response => {
+              if (!response.ok) console.error('Failed to queue note ingestion:', response.status);
+            })
+            .catch(error => console.error('Failed to queue note ingestion:', error));
+
           onFileUploaded?.(publicUrl, noteData);
           
           toast({
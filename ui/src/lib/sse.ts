@@ -0,0 +1,44 @@
+export type SSEHandler = (event: string, data: any) => void;
+
+/**
+ * Read a `text/event-stream` response body and call `onEvent` for each event.
+ * EventSource only supports GET, so POST endpoints are read with fetch instead.
+ */
+export async function readEventStream(response: Response, onEvent: SSEHandler): Promise<void> {
+  if (!response.body) throw new Error('Streaming is not supported by this browser');
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (block: string) => {
+    let event = 'message';
+    const dataLines: string[] = [];
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+    }
+    if (!dataLines.length) return;
+    const raw = dataLines.join('\n');
+    let data: any = raw;
+    try {
+      data = JSON.parse(raw);
+    } catch {
+      // Not JSON; pass the raw text through
+    }
+    onEvent(event, data);
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+  if (buffer.trim()) dispatch(buffer);
+}
@@ -18,6 +18,7 @@ import {
 } from "@/components/ui/select";
 import { useAuth } from '@/contexts/AuthContext';
 import { supabase } from '@/integrations/supabase/client';
+import { readEventStream } from '@/lib/sse';
 
 export default function AskAI() {
   const location = useLocation();
@@ -25,6 +26,8 @@ export default function AskAI() {
   const { user } = useAuth();
   const [selectedNoteId, setSelectedNoteId] = useState<string>('');
   const [messages, setMessages] = useState<any[]>([]);
+  // The server keeps the conversation history; we only echo its session id back
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const [input, setInput] = useState('');
   const [isRecording, setIsRecording] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
@@ -60,6 +63,7 @@ export default function AskAI() {
   // Update messages when selected note changes
   useEffect(() => {
     setMessages([]); // Clear messages when note changes
+    setSessionId(null);
   }, [selectedNoteId]);
 
   const handleSelectNote = (value: string) => {
@@ -112,12 +116,8 @@ export default function AskAI() {
       const payload = {
         note_id: selectedNoteId,
         question: input,
-        history: updatedMessages
-          .filter(m => m.type === 'user' || m.type === 'ai')
-          .map(m => ({
-            role: m.type === 'user' ? 'user' : 'assistant',
-            content: m.message
-          }))
+        stream: true,
+        session_id: sessionId
       };
       
       console.log('Request payload:', JSON.stringify(payload, null, 2));
@@ -126,22 +126,15 @@ export default function AskAI() {
         method: 'POST',
         headers: { 
           'Content-Type': 'application/json',
-          'Accept': 'application/json'
+          'Accept': 'text/event-stream'
         },
         body: JSON.stringify(payload)
       });
       
       console.log('Response status:', response.status);
-      console.log('Response headers:', Object.fromEntries(response.headers.entries()));
-      
-      const responseData = await response.json().catch(err => {
-        console.error('Error parsing response:', err);
-        return {};
-      });
-      
-      console.log('Response data:', responseData);
       
       if (!response.ok) {
+        const responseData = await response.json().catch(() => ({}));
         console.error('API Error:', response.status, response.statusText, responseData);
         throw new Error(
           responseData.detail || 
@@ -150,19 +143,40 @@ export default function AskAI() {
         );
       }
       
-      if (!responseData.answer) {
-        throw new Error('Invalid response from server');
-      }
-      
+      // Show the answer as it is generated
+      const aiMessageId = Date.now() + 1;
       const aiMessage = {
-        id: Date.now() + 1,
+        id: aiMessageId,
         type: 'ai' as const,
-        message: responseData.answer,
+        message: '',
         timestamp: new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
-        sources: Array.isArray(responseData.sources) ? responseData.sources : []
+        sources: [] as any[]
       };
-      
       setMessages(prevMessages => [...prevMessages, aiMessage]);
+      setIsLoading(false);
+      
+      const updateAiMessage = (update: (m: any) => any) =>
+        setMessages(prevMessages => prevMessages.map(m => (m.id === aiMessageId ? update(m) : m)));
+      
+      let answer = '';
+      let streamError = '';
+      await readEventStream(response, (event, data) => {
+        if (event === 'token') {
+          answer += data.text;
+          updateAiMessage(m => ({ ...m, message: answer }));
+        } else if (event === 'sources') {
+          updateAiMessage(m => ({ ...m, sources: Array.isArray(data.sources) ? data.sources : [] }));
+          if (data.session_id) setSessionId(data.session_id);
+        } else if (event === 'error') {
+          streamError = data.detail || 'The answer stream was interrupted';
+        }
+      });
+      
+      if (streamError || !answer) {
+        // Drop the partial answer; the error message is added below
+        setMessages(prevMessages => prevMessages.filter(m => m.id !== aiMessageId));
+        throw new Error(streamError || 'Invalid response from server');
+      }
     } catch (err: any) {
       console.error('Error in handleSend:', err);
       
@@ -211,6 +211,49 @@ export default function Podcast() {
   const currentTime = formatTime(progress);
   const totalTime = podcast?.duration ? formatTime(podcast.duration) : '10:22';
 
+  // Podcast generation runs as a background job; poll until it finishes
+  const pollPodcast = async (statusUrl: string) => {
+    while (true) {
+      await new Promise(resolve => setTimeout(resolve, 2000));
+      const statusResponse = await fetch(statusUrl);
+      if (!statusResponse.ok) {
+        throw new Error('Failed to check podcast status');
+      }
+      const status = await statusResponse.json();
+      if (status.status === 'completed') {
+        return status;
+      }
+      if (status.status === 'failed') {
+        throw new Error(status.message || 'Failed to generate podcast');
+      }
+    }
+  };
+
+  // Follow the job's progress events, falling back to polling if the stream is unavailable
+  const waitForPodcast = (eventsUrl: string, statusUrl: string) => {
+    if (typeof EventSource === 'undefined') return pollPodcast(statusUrl);
+    return new Promise<any>((resolve, reject) => {
+      const source = new EventSource(eventsUrl);
+      source.addEventListener('progress', (event) => {
+        const status = JSON.parse((event as MessageEvent).data);
+        console.log('Podcast progress:', status.message);
+      });
+      source.addEventListener('completed', (event) => {
+        source.close();
+        resolve(JSON.parse((event as MessageEvent).data));
+      });
+      source.addEventListener('failed', (event) => {
+        source.close();
+        const status = JSON.parse((event as MessageEvent).data);
+        reject(new Error(status.message || 'Failed to generate podcast'));
+      });
+      source.onerror = () => {
+        source.close();
+        pollPodcast(statusUrl).then(resolve, reject);
+      };
+    });
+  };
+
   const handleGenerate = async () => {
     if (!user) {
       toast({
@@ -249,7 +292,8 @@ export default function Podcast() {
         throw new Error(error.detail || 'Failed to generate podcast');
       }
 
-      const data = await response.json();
+      const { status_url, events_url } = await response.json();
+      const data = await waitForPodcast(events_url, status_url);
       setPodcast(data.podcast); // Save podcast info to state
       setPodcastGenerated(true);
       setProgress(0);
@@ -23,6 +23,7 @@ import { File, Copy, Download, Play } from 'lucide-react';
 import { useToast } from '@/components/ui/use-toast';
 import { useAuth } from '@/contexts/AuthContext';
 import { supabase } from '@/integrations/supabase/client';
+import { readEventStream } from '@/lib/sse';
 import ReactMarkdown from 'react-markdown';
 
 export default function Summarize() {
@@ -58,11 +59,23 @@ export default function Summarize() {
           note_id: selectedNote,
           format,
           length,
+          stream: true,
         }),
       });
       if (!response.ok) throw new Error("Failed to summarize note");
-      const data = await response.json();
-      setSummary(data.summary);
+      // Render the summary as it is generated
+      let text = "";
+      let streamError = false;
+      await readEventStream(response, (event, data) => {
+        if (event === "token") {
+          text += data.text;
+          setSummary(text);
+          setIsGenerating(false);
+        } else if (event === "error") {
+          streamError = true;
+        }
+      });
+      if (streamError || !text) throw new Error("Failed to summarize note");
     } catch (err) {
       toast({
         title: "Error",
@@ -1,54 +1,174 @@
 import io
 import json
 import os
+import tempfile
+import time
 import PyPDF2
-from typing import Dict, Optional
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional, Tuple
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+from metadata_store import PodcastMetadataStore
+
+# PDF extraction settings (0 disables the page/time budgets)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 24))
+PDF_PAGES_PER_BATCH = int(os.getenv("PDF_PAGES_PER_BATCH", 16))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 0))
+PDF_TIME_BUDGET = float(os.getenv("PDF_TIME_BUDGET", 0))
+
+# Podcast metadata database (replaces one metadata/<task_id>.json file per task)
+METADATA_DB_PATH = os.getenv("METADATA_DB_PATH", os.path.join("metadata", "podcasts.db"))
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Lazily create the process pool shared by all PDF extractions."""
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _pdf_pool
+
+# The document a pool worker last opened, so its later batches of that PDF skip re-parsing it
+_worker_reader: Optional[Tuple[str, PyPDF2.PdfReader]] = None
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """Extract pages [start, stop) of the PDF at ``pdf_path`` in a worker process."""
+    global _worker_reader
+    if _worker_reader is None or _worker_reader[0] != pdf_path:
+        _worker_reader = (pdf_path, PyPDF2.PdfReader(pdf_path))
+    pdf_reader = _worker_reader[1]
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def iter_pdf_pages(
+    pdf_bytes: bytes,
+    max_pages: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    workers: Optional[int] = None
+) -> Iterator[str]:
+    """Yield the text of each PDF page in order.
+
+    Large documents are split into page ranges that are parsed in parallel on
+    a process pool; pages are still yielded in document order as soon as
+    their range is done. The PDF is written to a temporary file once and each
+    worker opens it once, so a batch carries only its page range. Extraction stops early once ``max_pages`` pages have
+    been read or ``time_budget`` seconds have elapsed.
+    """
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    time_budget = PDF_TIME_BUDGET if time_budget is None else time_budget
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(pdf_reader.pages)
+    if max_pages and page_count > max_pages:
+        print(f"PDF has {page_count} pages, extracting the first {max_pages}")
+        page_count = max_pages
+
+    if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+        for i in range(page_count):
+            if deadline and time.monotonic() > deadline:
+                print(f"PDF time budget exhausted after {i} of {page_count} pages")
+                return
+            yield pdf_reader.pages[i].extract_text() or ""
+        return
+
+    pool = _get_pdf_pool()
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(pdf_bytes)
+    futures = [
+        pool.submit(_extract_page_range, pdf_path, start, min(start + PDF_PAGES_PER_BATCH, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_BATCH)
+    ]
+    try:
+        for batch_idx, future in enumerate(futures):
+            timeout = max(deadline - time.monotonic(), 0) if deadline else None
+            try:
+                pages = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                print(f"PDF time budget exhausted after {batch_idx * PDF_PAGES_PER_BATCH} of {page_count} pages")
+                return
+            yield from pages
+    finally:
+        for future in futures:
+            future.cancel()
+        # Every batch has finished or been abandoned; workers keep their own in-memory copy
+        try:
+            os.remove(pdf_path)
+        except OSError:
+            pass
+
+def extract_text_from_pdf(
+    pdf_bytes: bytes,
+    max_pages: Optional[int] = None,
+    time_budget: Optional[float] = None
+) -> str:
     """Extract text from a PDF file."""
     try:
         print(f"Extracting text from PDF, size: {len(pdf_bytes)} bytes")
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-        print(f"PDF has {len(pdf_reader.pages)} pages")
-        
-        text = ""
-        for i, page in enumerate(pdf_reader.pages):
-            page_text = page.extract_text()
-            print(f"Page {i+1} extracted, length: {len(page_text)}")
-            text += page_text + "\n"
-        
-        print(f"Total extracted text length: {len(text)}")
+        pages = list(iter_pdf_pages(pdf_bytes, max_pages=max_pages, time_budget=time_budget))
+        text = "".join(f"{page_text}\n" for page_text in pages)
+        print(f"Extracted {len(pages)} pages, total text length: {len(text)}")
         print("Text preview:", text[:200])
         return text
     except Exception as e:
         print(f"Error in extract_text_from_pdf: {str(e)}")
         raise Exception(f"Error extracting text from PDF: {str(e)}")
 
-def clean_text(text: str) -> str:
-    """Clean and normalize text."""
-    print(f"Cleaning text of length: {len(text)}")
+def _normalize_text(text: str) -> str:
     # Remove extra whitespace
     text = " ".join(text.split())
     # Remove special characters that might affect speech
     text = text.replace("•", "")
     text = text.replace("…", "...")
+    return text
+
+def extract_clean_pages(
+    pdf_bytes: bytes,
+    max_pages: Optional[int] = None,
+    time_budget: Optional[float] = None
+) -> List[str]:
+    """Extract the text of each PDF page, cleaned the same way as clean_text."""
+    try:
+        print(f"Extracting pages from PDF, size: {len(pdf_bytes)} bytes")
+        pages = [_normalize_text(page_text) for page_text in
+                 iter_pdf_pages(pdf_bytes, max_pages=max_pages, time_budget=time_budget)]
+        print(f"Extracted {len(pages)} pages, total text length: {sum(len(p) for p in pages)}")
+        return pages
+    except Exception as e:
+        print(f"Error in extract_clean_pages: {str(e)}")
+        raise Exception(f"Error extracting text from PDF: {str(e)}")
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text."""
+    print(f"Cleaning text of length: {len(text)}")
+    text = _normalize_text(text)
     print(f"Cleaned text length: {len(text)}")
     print("Cleaned text preview:", text[:200])
     return text
 
+_metadata_store: Optional[PodcastMetadataStore] = None
+
+def get_metadata_store() -> PodcastMetadataStore:
+    """Lazily open the podcast metadata database shared by the helpers below."""
+    global _metadata_store
+    if _metadata_store is None:
+        _metadata_store = PodcastMetadataStore(METADATA_DB_PATH)
+    return _metadata_store
+
 def save_podcast_metadata(task_id: str, metadata: Dict) -> None:
-    """Save podcast metadata to a JSON file."""
+    """Save podcast metadata (merged into any existing record)."""
     try:
-        os.makedirs("metadata", exist_ok=True)
-        metadata_path = os.path.join("metadata", f"{task_id}.json")
-        with open(metadata_path, "w") as f:
-            json.dump(metadata, f)
+        get_metadata_store().save(task_id, metadata)
     except Exception as e:
         raise Exception(f"Error saving metadata: {str(e)}")
 
 def get_podcast_metadata(task_id: str) -> Optional[Dict]:
-    """Get podcast metadata from JSON file."""
+    """Get podcast metadata, falling back to a legacy JSON file not yet migrated."""
     try:
+        metadata = get_metadata_store().get(task_id)
+        if metadata is not None:
+            return metadata
         metadata_path = os.path.join("metadata", f"{task_id}.json")
         if not os.path.exists(metadata_path):
             return None
@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+import logging
+import os
+
+from prometheus_client import start_http_server
+
+from jobs import run_worker
+
+logger = logging.getLogger("worker")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run podcast generation jobs from the shared job store')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv("WORKER_CONCURRENCY", 2)),
+                        help='Number of jobs this process runs at once')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds to wait before checking an empty queue again')
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv("WORKER_METRICS_PORT", 9101)),
+                        help='Port for this process\'s Prometheus metrics (0 to disable; one per worker process)')
+    parser.add_argument('--groq-share', type=float, default=float(os.getenv("WORKER_GROQ_RATE_SHARE", 0.25)),
+                        help='Fraction of the Groq request/token limits this process may use')
+    args = parser.parse_args()
+
+    # The rate limits are enforced per process, so each worker takes only its share of the account's
+    os.environ["GROQ_RATE_SHARE"] = str(args.groq_share)
+
+    # Importing app loads configuration and the job handlers; the web server is not started
+    from app import job_store, run_job, finish_failed_job
+
+    logger.info(f"Starting worker (pid {os.getpid()}) on {job_store.db_path} with a {args.groq_share:g} share of the Groq limits")
+    # Jobs run here, so their stage and TTS timings are only in this process's registry
+    if args.metrics_port:
+        try:
+            start_http_server(args.metrics_port)
+            logger.info(f"Serving worker metrics on port {args.metrics_port}")
+        except OSError as e:
+            logger.error(f"Could not serve metrics on port {args.metrics_port}: {e}")
+    try:
+        asyncio.run(run_worker(job_store, run_job, concurrency=args.concurrency,
+                               poll_interval=args.poll_interval, on_expired=finish_failed_job))
+    except KeyboardInterrupt:
+        logger.info("Worker stopped")
+
+if __name__ == "__main__":
+    main()